@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Sequence
+
+from sqlalchemy import case, delete, func, insert, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session as OrmSession
+
+from db import upsert
+import choice_mask
+from grading import Graded
+from models import Answer, Question, Session, TopicStat
+import question_bank
+
+
+# ── Statistiques par thème ────────────────────────────────────────────────────
+# topic_stats est tenu à jour par submit_quiz (un upsert incrémental par
+# soumission) : les rapports lisent quelques centaines de lignes au plus,
+# jamais la table answers, et couvrent tout l'historique. Une resoumission
+# remplace la précédente (comme dans answers) : seul l'écart est appliqué,
+# l'agrégat reste égal à ce que rebuild() recalculerait.
+
+DIMENSIONS = {
+    "role":       "Rôle",
+    "experience": "Expérience",
+    "shop_type":  "Type de magasin",
+}
+
+
+def stored_results(db: OrmSession, session_id: int) -> Dict[int, bool]:
+    """is_correct déjà enregistré par question (soumission précédente)."""
+    return {
+        qid: bool(ok)
+        for qid, ok in db.execute(
+            select(Answer.question_id, Answer.is_correct).where(Answer.session_id == session_id)
+        )
+    }
+
+
+def record_submission(db: OrmSession, sess: Session, graded: Sequence[Graded],
+                      previous: Mapping[int, bool] = MappingProxyType({})) -> None:
+    """Reporte une soumission dans l'agrégat.
+
+    previous : résultats déjà comptés pour cette session (stored_results, lu
+    avant l'écriture des réponses) ; vide à la première soumission.
+    """
+    per_topic: Dict[str, List[int]] = {}
+    for g in graded:
+        old = previous.get(g.question.id)
+        counts = per_topic.setdefault(g.question.topic, [0, 0])
+        counts[0] += 1 if old is None else 0
+        counts[1] += int(g.is_correct) - int(bool(old))
+    per_topic = {t: c for t, c in per_topic.items() if c != [0, 0]}
+    upsert(
+        db, TopicStat.__table__,
+        [
+            {
+                "topic":      topic,
+                "role":       sess.role or "",
+                "experience": sess.experience or "",
+                "shop_type":  sess.shop_type or "",
+                "answered":   answered,
+                "correct":    correct,
+            }
+            for topic, (answered, correct) in per_topic.items()
+        ],
+        index_elements=["topic", "role", "experience", "shop_type"],
+        update_columns=["answered", "correct"],
+        increment=True,
+    )
+
+
+def rebuild(conn) -> None:
+    """Recalcule topic_stats depuis answers (initialisation de l'historique)."""
+    conn.execute(delete(TopicStat))
+    conn.execute(
+        insert(TopicStat).from_select(
+            ["topic", "role", "experience", "shop_type", "answered", "correct"],
+            select(
+                Question.topic,
+                func.coalesce(Session.role, ""),
+                func.coalesce(Session.experience, ""),
+                func.coalesce(Session.shop_type, ""),
+                func.count(Answer.id),
+                func.sum(case((Answer.is_correct.is_(True), 1), else_=0)),
+            )
+            .join(Question, Question.id == Answer.question_id)
+            .join(Session, Session.id == Answer.session_id)
+            .group_by(Question.topic, Session.role, Session.experience, Session.shop_type),
+        )
+    )
+
+
+def _rate(answered: int, correct: int) -> int:
+    return round(correct / answered * 100) if answered else 0
+
+
+def topic_report(db: OrmSession, by: str | None = None) -> List[Dict[str, Any]]:
+    """Taux de réussite par thème, éventuellement ventilé par une dimension du profil."""
+    totals = db.execute(
+        select(TopicStat.topic, func.sum(TopicStat.answered), func.sum(TopicStat.correct))
+        .group_by(TopicStat.topic)
+        .order_by(TopicStat.topic)
+    ).all()
+
+    breakdown: Dict[str, List[Dict[str, Any]]] = {}
+    if by in DIMENSIONS:
+        col = getattr(TopicStat, by)
+        for topic, value, answered, correct in db.execute(
+            select(TopicStat.topic, col, func.sum(TopicStat.answered), func.sum(TopicStat.correct))
+            .group_by(TopicStat.topic, col)
+            .order_by(TopicStat.topic, col)
+        ):
+            breakdown.setdefault(topic, []).append({
+                "value":    value,
+                "answered": int(answered or 0),
+                "correct":  int(correct or 0),
+                "rate":     _rate(int(answered or 0), int(correct or 0)),
+            })
+
+    return [
+        {
+            "topic":     topic,
+            "answered":  int(answered or 0),
+            "correct":   int(correct or 0),
+            "rate":      _rate(int(answered or 0), int(correct or 0)),
+            "breakdown": breakdown.get(topic, []),
+        }
+        for topic, answered, correct in totals
+    ]
+
+
+# ── Choix cochés ──────────────────────────────────────────────────────────────
+# Comptages sur Answer.selected_mask (choice_mask) : un GROUP BY entier servi
+# par l'index couvrant (question_id, selected_mask), sans décoder le JSON.
+
+def selected_contains(dialect: str, choice_id: str):
+    """Condition « le choix figure dans selected_json » (PostgreSQL : index GIN).
+
+    Sert à recalculer selected_mask depuis le JSON (migrations).
+    """
+    if dialect == "postgresql":
+        # Comparateur JSONB (@>) : le type variant expose celui de JSON
+        return type_coerce(Answer.selected, JSONB).contains([choice_id])
+    elems = func.json_each(Answer.selected).table_valued("value")
+    return select(1).select_from(elems).where(elems.c.value == choice_id).exists()
+
+
+def choice_counts(db: OrmSession, question_id: int) -> Dict[str, Any]:
+    """Réponses à une question et nombre de fois où chaque choix a été coché."""
+    # Au plus 2^n sélections distinctes : le détail par choix se fait ici
+    per_mask = db.execute(
+        select(Answer.selected_mask, func.count())
+        .where(Answer.question_id == question_id)
+        .group_by(Answer.selected_mask)
+    ).all()
+    q = question_bank.get_bank(db).get(question_id)
+    ids = q.choice_ids if q is not None else ()
+    counts = {cid: 0 for cid in ids}
+    for mask, n in per_mask:
+        for cid in choice_mask.decode(ids, mask or 0):
+            counts[cid] += n
+    return {"question_id": question_id, "answered": sum(n for _, n in per_mask),
+            "choices": counts}
@@ -1,69 +1,193 @@
 from __future__ import annotations
 
-import csv
-import io
+import base64
+import hashlib
+import hmac
 import json
+import os
 import secrets
-from typing import Any, Dict, List
+import time
+from typing import Optional
 
 from fastapi import FastAPI, Request, Depends
-from fastapi.responses import RedirectResponse, HTMLResponse, StreamingResponse
+from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session as OrmSession
-
-from db import engine, Base, get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import engine, async_engine, get_async_db, pool_status
+import analytics
+import assets
+import bootstrap
+import fiches
+import grading
+import item_analysis
+import metrics
 import models
+import page_cache
+import profiling
+import query_guard
+import question_bank
+import reporting
+import search
 import seed
 
 app = FastAPI(title="Podologie • Formation vendeurs")
 
+# Instrumentation (/metrics) : latence par route, requêtes SQL, rendu des templates
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+# Détection N+1 / requêtes lentes, seulement si QUERY_GUARD=warn|raise (dev, CI)
+query_guard.install(app, engine, async_engine.sync_engine)
+# Profilage CPU + mémoire à la demande : ?profile=1 ou X-Profile: 1, admins seulement
+app.add_middleware(profiling.ProfilingMiddleware, authorize=lambda scope: is_admin(Request(scope)))
+
 app.mount("/static", StaticFiles(directory="static"), name="static")
+# Fichiers versionnés (python assets.py au build) : cache long + précompression
+app.mount(assets.URL_PREFIX, assets.ImmutableStaticFiles(directory=assets.DIST_DIR, check_dir=False),
+          name="assets")
 templates = Jinja2Templates(directory="templates")
+templates.env.template_class = metrics.TimedTemplate
+templates.env.globals["asset"] = assets.asset
 
 # ── Mot de passe admin ────────────────────────────────────────────────────────
 ADMIN_PASSWORD = "admin"
-_admin_sessions: set[str] = set()
+
+# Jetons admin signés (HMAC) : vérifiables par n'importe quel worker sans état
+# partagé. ADMIN_SECRET doit être identique pour tous les workers ; à défaut,
+# un secret aléatoire est tiré (connexions valables pour ce seul processus).
+ADMIN_SECRET = os.environ.get("ADMIN_SECRET") or secrets.token_urlsafe(32)
+ADMIN_TOKEN_TTL = 3600 * 8
+
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(ADMIN_SECRET.encode(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def make_admin_token(now: Optional[float] = None) -> str:
+    issued_at = int(now if now is not None else time.time())
+    payload = f"{issued_at}.{secrets.token_urlsafe(8)}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def check_admin_token(token: str, now: Optional[float] = None) -> bool:
+    try:
+        issued_at, nonce, sig = token.split(".")
+        age = (now if now is not None else time.time()) - int(issued_at)
+    except ValueError:
+        return False
+    if not 0 <= age <= ADMIN_TOKEN_TTL:
+        return False
+    # Octets : compare_digest refuse les str non ASCII (cookie forgé → 500)
+    return hmac.compare_digest(sig.encode("utf-8", "replace"),
+                               _sign(f"{issued_at}.{nonce}").encode())
 
 
 def is_admin(request: Request) -> bool:
     token = request.cookies.get("admin_token", "")
-    return token in _admin_sessions
+    return check_admin_token(token)
 
 
 # ── Startup ───────────────────────────────────────────────────────────────────
 
 @app.on_event("startup")
 def _startup() -> None:
-    import os
     db_url = os.environ.get("DATABASE_URL", "")
     if db_url:
         print(f"✅ BASE : PostgreSQL ({db_url[:40]}...)")
     else:
         print("⚠️  BASE : SQLite local — données non persistantes !")
-    Base.metadata.create_all(bind=engine)
-    # S'assurer que les questions existent dès le démarrage
-    from db import SessionLocal
-    db = SessionLocal()
-    try:
-        seed.ensure_questions(db)
-    finally:
-        db.close()
+    if not os.environ.get("ADMIN_SECRET"):
+        print("⚠️  ADMIN_SECRET absent — connexions admin limitées à ce processus")
+    # Schéma + questions : une seule fois par déploiement, sous verrou
+    if bootstrap.run(engine):
+        print("✅ Bootstrap schéma + questions effectué")
+
+
+# ── Santé / pool de connexions ───────────────────────────────────────────────
+
+@app.get("/healthz")
+async def healthz():
+    return {
+        "status": "ok",
+        "pool": {
+            "async": pool_status(async_engine.sync_engine),
+            "sync":  pool_status(engine),
+        },
+    }
+
+
+@app.get("/metrics")
+def metrics_text(request: Request):
+    if not is_admin(request):
+        return Response("unauthorized\n", status_code=401, media_type="text/plain")
+    return Response(metrics.render_text(), media_type=metrics.CONTENT_TYPE)
 
 
 # ── Landing ───────────────────────────────────────────────────────────────────
 
 @app.get("/", response_class=HTMLResponse)
 def landing(request: Request):
-    return templates.TemplateResponse(
-        "landing.html",
-        {"request": request, "byline": "BY Clara Vialle"},
-    )
+    return page_cache.render(request, templates, "landing.html", {"byline": "BY Clara Vialle"})
 
 
 @app.get("/fiches", response_class=HTMLResponse)
-def fiches(request: Request):
-    return templates.TemplateResponse("fiches.html", {"request": request})
+def fiches_page(request: Request):
+    return page_cache.render(request, templates, "fiches.html", {"fiches": fiches.FICHES})
+
+
+# ── Fiches PDF : Range / ETag, aperçu, version web, texte ────────────────────
+
+@app.api_route("/fiches/{slug}.pdf", methods=["GET", "HEAD"])
+def fiche_pdf(slug: str, request: Request):
+    f = fiches.BY_SLUG.get(slug)
+    if f is None:
+        return Response("Fiche introuvable", status_code=404)
+    return fiches.send_file(request, f.path, "application/pdf", filename=f.filename)
+
+
+@app.api_route("/fiches/{slug}/web.pdf", methods=["GET", "HEAD"])
+def fiche_web_pdf(slug: str, request: Request):
+    f = fiches.BY_SLUG.get(slug)
+    if f is None:
+        return Response("Fiche introuvable", status_code=404)
+    return fiches.send_file(request, fiches.web_pdf_path(f), "application/pdf",
+                            filename=f.filename)
+
+
+@app.api_route("/fiches/{slug}/preview.jpg", methods=["GET", "HEAD"])
+def fiche_preview(slug: str, request: Request):
+    f = fiches.BY_SLUG.get(slug)
+    if f is None:
+        return Response("Fiche introuvable", status_code=404)
+    return fiches.send_file(request, f.derived("preview.jpg"), "image/jpeg")
+
+
+@app.api_route("/fiches/{slug}/texte.txt", methods=["GET", "HEAD"])
+def fiche_text(slug: str, request: Request):
+    f = fiches.BY_SLUG.get(slug)
+    if f is None:
+        return Response("Fiche introuvable", status_code=404)
+    return fiches.send_file(request, f.derived("texte.txt"), "text/plain; charset=utf-8")
+
+
+# ── Recherche (fiches + questions) ────────────────────────────────────────────
+
+@app.get("/search", response_class=HTMLResponse)
+def search_page(request: Request, q: str = ""):
+    q = q.strip()[:200]
+    return templates.TemplateResponse("search.html", {
+        "request": request, "q": q, "results": search.search(q) if q else [],
+    })
+
+
+@app.get("/search.json")
+def search_json(q: str = "", limit: int = 20):
+    q = q.strip()[:200]
+    return {"q": q, "results": search.search(q, limit=max(1, min(limit, 50)))}
 
 
 # ── Page profil : affichage direct, sans créer de session ────────────────────
@@ -71,7 +195,7 @@ def fiches(request: Request):
 @app.get("/quiz", response_class=HTMLResponse)
 def quiz_start(request: Request):
     """Affiche le formulaire profil sans créer de session."""
-    return templates.TemplateResponse("profil.html", {"request": request, "token": ""})
+    return page_cache.render(request, templates, "profil.html", {"token": ""})
 
 
 @app.post("/start")
@@ -83,7 +207,7 @@ def start(request: Request):
 # ── Soumission du profil : crée la session ici ───────────────────────────────
 
 @app.post("/quiz", response_class=HTMLResponse)
-async def profil_save(request: Request, db: OrmSession = Depends(get_db)):
+async def profil_save(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Reçoit le profil, crée la session ET tire les questions, redirige vers le quiz."""
     form = await request.form()
 
@@ -95,18 +219,16 @@ async def profil_save(request: Request, db: OrmSession = Depends(get_db)):
             "error": "Vous devez accepter le consentement pour continuer."
         })
 
-    # Créer la session avec tirage aléatoire
-    token = seed.upsert_seed(db=db)
-
-    # Récupérer la session fraîchement créée et y enregistrer le profil
-    sess = db.query(models.Session).filter(models.Session.token == token).first()
-    sess.prenom     = form.get("prenom", "").strip()
-    sess.nom        = form.get("nom", "").strip()
-    sess.role       = form.get("role", "").strip()
-    sess.experience = form.get("experience", "").strip()
-    sess.shop_type  = form.get("shop_type", "").strip()
-    sess.consent    = True
-    db.commit()
+    # Créer la session (profil + tirage aléatoire) en un seul commit
+    token = await db.run_sync(
+        seed.new_session,
+        prenom     = form.get("prenom", "").strip(),
+        nom        = form.get("nom", "").strip(),
+        role       = form.get("role", "").strip(),
+        experience = form.get("experience", "").strip(),
+        shop_type  = form.get("shop_type", "").strip(),
+        consent    = True,
+    )
 
     return RedirectResponse(url=f"/t/{token}", status_code=302)
 
@@ -114,8 +236,8 @@ async def profil_save(request: Request, db: OrmSession = Depends(get_db)):
 # ── Quiz ──────────────────────────────────────────────────────────────────────
 
 @app.get("/t/{token}", response_class=HTMLResponse)
-def take_quiz(token: str, request: Request, db: OrmSession = Depends(get_db)):
-    sess = db.query(models.Session).filter(models.Session.token == token).first()
+async def take_quiz(token: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    sess = await db.scalar(select(models.Session).where(models.Session.token == token))
     if not sess:
         return templates.TemplateResponse("done.html", {
             "request": request,
@@ -125,7 +247,7 @@ def take_quiz(token: str, request: Request, db: OrmSession = Depends(get_db)):
     if not sess.prenom:
         return RedirectResponse(url="/quiz", status_code=302)
 
-    quiz = db.query(models.Quiz).filter(models.Quiz.id == sess.quiz_id).first()
+    quiz = await db.get(models.Quiz, sess.quiz_id)
     if not quiz:
         return templates.TemplateResponse("done.html", {
             "request": request, "message": "Quiz introuvable."
@@ -137,41 +259,22 @@ def take_quiz(token: str, request: Request, db: OrmSession = Depends(get_db)):
     except Exception:
         chosen_ids = []
 
+    bank = await db.run_sync(question_bank.get_bank)
     if chosen_ids:
-        questions_map = {
-            q.id: q for q in
-            db.query(models.Question).filter(models.Question.id.in_(chosen_ids)).all()
-        }
-        questions = [questions_map[qid] for qid in chosen_ids if qid in questions_map]
+        questions = bank.pick(chosen_ids)
     else:
-        questions = (
-            db.query(models.Question)
-            .filter(models.Question.quiz_id == quiz.id)
-            .order_by(models.Question.id.asc())
-            .all()
-        )
-
-    q_payload: List[Dict[str, Any]] = []
-    for q in questions:
-        try:
-            choices = json.loads(q.choices_json or "[]")
-        except Exception:
-            choices = []
-        q_payload.append({
-            "id": q.id, "kind": q.kind,
-            "topic": q.topic, "text": q.text, "choices": choices
-        })
+        questions = list(bank.for_quiz(quiz.id))
 
     return templates.TemplateResponse(
         "quiz.html",
         {"request": request, "quiz_title": quiz.title, "token": token,
-         "questions": q_payload, "prenom": sess.prenom},
+         "questions": questions, "prenom": sess.prenom},
     )
 
 
 @app.post("/t/{token}", response_class=HTMLResponse)
-async def submit_quiz(token: str, request: Request, db: OrmSession = Depends(get_db)):
-    sess = db.query(models.Session).filter(models.Session.token == token).first()
+async def submit_quiz(token: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    sess = await db.scalar(select(models.Session).where(models.Session.token == token))
     if not sess:
         return templates.TemplateResponse("done.html", {
             "request": request,
@@ -185,93 +288,19 @@ async def submit_quiz(token: str, request: Request, db: OrmSession = Depends(get
     except Exception:
         chosen_ids = []
 
+    bank = await db.run_sync(question_bank.get_bank)
     if chosen_ids:
-        questions_map = {
-            q.id: q for q in
-            db.query(models.Question).filter(models.Question.id.in_(chosen_ids)).all()
-        }
-        questions = [questions_map[qid] for qid in chosen_ids if qid in questions_map]
+        questions = bank.pick(chosen_ids)
     else:
-        questions = (
-            db.query(models.Question)
-            .filter(models.Question.quiz_id == sess.quiz_id)
-            .order_by(models.Question.id.asc())
-            .all()
-        )
-
-    correct_count = 0
-    for q in questions:
-        key = f"q{q.id}"
-        if q.kind == "multi":
-            selected_ids = sorted([str(x) for x in form.getlist(key)])
-        else:
-            v = form.get(key, "")
-            selected_ids = [str(v)] if v else []
-
-        try:
-            choices = json.loads(q.choices_json or "[]")
-        except Exception:
-            choices = []
-        correct_ids = sorted([c.get("id") for c in choices if c.get("is_correct")])
-        is_correct = (selected_ids == correct_ids)
-        if is_correct:
-            correct_count += 1
-
-        existing = (
-            db.query(models.Answer)
-            .filter(models.Answer.session_id == sess.id,
-                    models.Answer.question_id == q.id)
-            .first()
-        )
-        if existing:
-            existing.selected_json = json.dumps(selected_ids, ensure_ascii=False)
-            existing.is_correct = is_correct
-        else:
-            db.add(models.Answer(
-                session_id=sess.id,
-                question_id=q.id,
-                selected_json=json.dumps(selected_ids, ensure_ascii=False),
-                is_correct=is_correct,
-            ))
-
-    db.commit()
-
-    # Construire le détail par question pour done.html
-    detail = []
-    for q in questions:
-        try:
-            choices = json.loads(q.choices_json or "[]")
-        except Exception:
-            choices = []
-        correct_ids = sorted([c.get("id") for c in choices if c.get("is_correct")])
-        key = f"q{q.id}"
-        if q.kind == "multi":
-            selected_ids = sorted([str(x) for x in form.getlist(key)])
-        else:
-            v = form.get(key, "")
-            selected_ids = [str(v)] if v else []
-
-        is_correct = (selected_ids == correct_ids)
-
-        # Labels lisibles
-        id_to_label = {c.get("id"): c.get("label", "") for c in choices}
-        selected_labels = [id_to_label.get(i, i) for i in selected_ids]
-        correct_labels  = [id_to_label.get(i, i) for i in correct_ids]
-
-        # Pour multi : quelles réponses manquaient ou étaient en trop
-        missing  = [id_to_label.get(i, i) for i in correct_ids  if i not in selected_ids]
-        extra    = [id_to_label.get(i, i) for i in selected_ids if i not in correct_ids]
-
-        detail.append({
-            "topic":            q.topic,
-            "text":             q.text,
-            "kind":             q.kind,
-            "is_correct":       is_correct,
-            "selected_labels":  selected_labels,
-            "correct_labels":   correct_labels,
-            "missing":          missing,
-            "extra":            extra,
-        })
+        questions = list(bank.for_quiz(sess.quiz_id))
+
+    # Correction en une passe : sert à l'enregistrement et au détail
+    graded = grading.grade_form(questions, form)
+    correct_count = await db.run_sync(seed.submit_answers, sess, graded)
+    await db.commit()
+
+    # Détail par question pour done.html
+    detail = [g.feedback() for g in graded]
 
     return templates.TemplateResponse("done.html", {
         "request": request,
@@ -298,11 +327,10 @@ async def admin_login(request: Request):
     password = form.get("password", "")
 
     if password == ADMIN_PASSWORD:
-        token = secrets.token_urlsafe(32)
-        _admin_sessions.add(token)
+        token = make_admin_token()
         response = RedirectResponse(url="/admin", status_code=302)
         response.set_cookie("admin_token", token, httponly=True,
-                            samesite="lax", max_age=3600 * 8)
+                            samesite="lax", max_age=ADMIN_TOKEN_TTL)
         return response
 
     return templates.TemplateResponse("login.html", {
@@ -313,8 +341,6 @@ async def admin_login(request: Request):
 
 @app.get("/admin/logout")
 def admin_logout(request: Request):
-    token = request.cookies.get("admin_token", "")
-    _admin_sessions.discard(token)
     response = RedirectResponse(url="/", status_code=302)
     response.delete_cookie("admin_token")
     return response
@@ -323,145 +349,110 @@ def admin_logout(request: Request):
 # ── Admin — Dashboard ─────────────────────────────────────────────────────────
 
 @app.get("/admin", response_class=HTMLResponse)
-def admin(request: Request, db: OrmSession = Depends(get_db)):
+async def admin(request: Request, before: Optional[int] = None, after: Optional[int] = None,
+                db: AsyncSession = Depends(get_async_db)):
     if not is_admin(request):
         return RedirectResponse(url="/admin/login", status_code=302)
 
-    sessions = db.query(models.Session).order_by(models.Session.id.desc()).limit(200).all()
-    sessions_data = []
-    for s in sessions:
-        answers = db.query(models.Answer).filter(models.Answer.session_id == s.id).all()
-        try:
-            total_q = len(json.loads(s.question_ids_json or "[]"))
-        except Exception:
-            total_q = len(answers)
-        if total_q == 0:
-            total_q = len(answers)
-        correct = sum(1 for a in answers if a.is_correct)
-
-        # Détail par question
-        detail = []
-        for a in answers:
-            q = db.query(models.Question).filter(models.Question.id == a.question_id).first()
-            if not q:
-                continue
-            try:
-                choices  = json.loads(q.choices_json or "[]")
-                selected = json.loads(a.selected_json or "[]")
-            except Exception:
-                choices, selected = [], []
-            id_to_label = {c.get("id"): c.get("label", "") for c in choices}
-            correct_ids = sorted([c.get("id") for c in choices if c.get("is_correct")])
-            missing = [id_to_label.get(i, i) for i in correct_ids if i not in selected]
-            extra   = [id_to_label.get(i, i) for i in selected  if i not in correct_ids]
-            detail.append({
-                "topic":           q.topic,
-                "text":            q.text,
-                "kind":            q.kind,
-                "is_correct":      a.is_correct,
-                "selected_labels": [id_to_label.get(i, i) for i in selected],
-                "correct_labels":  [id_to_label.get(i, i) for i in correct_ids],
-                "missing":         missing,
-                "extra":           extra,
-            })
-
-        sessions_data.append({
-            "session":    s,
-            "correct":    correct,
-            "total":      total_q,
-            "score_pct":  round(correct / total_q * 100) if total_q else 0,
-            "detail":     detail,
-        })
+    page = await db.run_sync(reporting.load_page, before=before, after=after)
+    stats = await db.run_sync(reporting.dashboard_stats)
 
     return templates.TemplateResponse("admin.html", {
-        "request": request, "sessions_data": sessions_data
+        "request": request, "sessions_data": page["rows"], "stats": stats,
+        "newer": page["newer"], "older": page["older"],
+    })
+
+
+@app.get("/admin/sessions/{session_id}/detail")
+async def admin_session_detail(session_id: int, request: Request,
+                               db: AsyncSession = Depends(get_async_db)):
+    """Détail par question d'une session, chargé quand la ligne est dépliée."""
+    if not is_admin(request):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+    detail = await db.run_sync(reporting.session_detail, session_id)
+    return {"detail": detail}
+
+
+@app.get("/admin/analytics", response_class=HTMLResponse)
+async def admin_analytics(request: Request, by: Optional[str] = None,
+                          db: AsyncSession = Depends(get_async_db)):
+    if not is_admin(request):
+        return RedirectResponse(url="/admin/login", status_code=302)
+
+    if by not in analytics.DIMENSIONS:
+        by = None
+    report = await db.run_sync(analytics.topic_report, by=by)
+    return templates.TemplateResponse("analytics.html", {
+        "request": request, "report": report, "by": by,
+        "dimensions": analytics.DIMENSIONS,
+    })
+
+
+@app.get("/admin/analytics.json")
+async def admin_analytics_json(request: Request, by: Optional[str] = None,
+                               db: AsyncSession = Depends(get_async_db)):
+    if not is_admin(request):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+    if by not in analytics.DIMENSIONS:
+        by = None
+    return {"by": by, "topics": await db.run_sync(analytics.topic_report, by=by)}
+
+
+@app.get("/admin/questions/{question_id}/choices.json")
+async def admin_question_choices_json(request: Request, question_id: int,
+                                      db: AsyncSession = Depends(get_async_db)):
+    """Nombre de fois où chaque choix a été coché (agrégé en SQL)."""
+    if not is_admin(request):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+    return await db.run_sync(analytics.choice_counts, question_id)
+
+
+@app.get("/admin/questions", response_class=HTMLResponse)
+async def admin_questions(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Qualité des questions : difficulté, discrimination, distracteurs."""
+    if not is_admin(request):
+        return RedirectResponse(url="/admin/login", status_code=302)
+
+    items = await db.run_sync(item_analysis.report)
+    return templates.TemplateResponse("questions.html", {
+        "request": request, "items": items,
     })
 
 
+@app.get("/admin/profiles", response_class=HTMLResponse)
+def admin_profiles(request: Request):
+    """Profils enregistrés (requêtes admin lancées avec ?profile=1)."""
+    if not is_admin(request):
+        return RedirectResponse(url="/admin/login", status_code=302)
+
+    return templates.TemplateResponse("profiles.html", {
+        "request": request, "profiles": profiling.list_profiles(),
+    })
+
+
+@app.get("/admin/profiles/{profile_id}.folded")
+def admin_profile_folded(profile_id: str, request: Request):
+    if not is_admin(request):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+
+    path = profiling.folded_path(profile_id)
+    if path is None:
+        return Response("Profil introuvable", status_code=404)
+    return fiches.send_file(request, path, "text/plain; charset=utf-8",
+                            filename=f"{profile_id}.folded",
+                            cache_control="private, no-store")
+
+
 @app.get("/admin/export.csv")
-def export_csv(request: Request, db: OrmSession = Depends(get_db)):
+def export_csv(request: Request):
     if not is_admin(request):
         return RedirectResponse(url="/admin/login", status_code=302)
 
-    out = io.StringIO()
-    # BOM UTF-8 pour que Excel l'ouvre correctement avec les accents
-    out.write('\ufeff')
-    w = csv.writer(out, delimiter=';')
-
-    # En-tête
-    w.writerow([
-        "date", "prenom", "nom", "role", "experience", "type_magasin",
-        "score_global", "total", "score_pct",
-        "n_question", "theme", "question", "type",
-        "reponse_donnee", "bonne_reponse", "correct",
-        "manquait", "en_trop"
-    ])
-
-    sessions = db.query(models.Session).order_by(models.Session.id.desc()).all()
-    for s in sessions:
-        answers = db.query(models.Answer).filter(models.Answer.session_id == s.id).all()
-        try:
-            total_q = len(json.loads(s.question_ids_json or "[]"))
-        except Exception:
-            total_q = len(answers)
-        if total_q == 0:
-            total_q = len(answers)
-        correct_total = sum(1 for a in answers if a.is_correct)
-        pct = round(correct_total / total_q * 100) if total_q else 0
-
-        if not answers:
-            # Candidat sans réponses — une ligne quand même
-            w.writerow([
-                s.created_at.strftime('%d/%m/%Y %H:%M') if s.created_at else '',
-                s.prenom, s.nom,
-                s.role.replace('_', ' ') if s.role else '',
-                s.experience.replace('_', ' ') if s.experience else '',
-                s.shop_type.replace('_', ' ') if s.shop_type else '',
-                0, total_q, 0,
-                '', '', '', '', '', '', '', '', ''
-            ])
-            continue
-
-        for i, a in enumerate(answers, 1):
-            q = db.query(models.Question).filter(models.Question.id == a.question_id).first()
-            if not q:
-                continue
-            try:
-                choices  = json.loads(q.choices_json or "[]")
-                selected = json.loads(a.selected_json or "[]")
-            except Exception:
-                choices, selected = [], []
-
-            id_to_label = {c.get("id"): c.get("label", "") for c in choices}
-            correct_ids = sorted([c.get("id") for c in choices if c.get("is_correct")])
-            selected_ids = sorted(selected)
-
-            selected_labels = " | ".join([id_to_label.get(x, x) for x in selected_ids])
-            correct_labels  = " | ".join([id_to_label.get(x, x) for x in correct_ids])
-            missing = " | ".join([id_to_label.get(x, x) for x in correct_ids if x not in selected_ids])
-            extra   = " | ".join([id_to_label.get(x, x) for x in selected_ids if x not in correct_ids])
-
-            w.writerow([
-                s.created_at.strftime('%d/%m/%Y %H:%M') if s.created_at else '',
-                s.prenom, s.nom,
-                s.role.replace('_', ' ') if s.role else '',
-                s.experience.replace('_', ' ') if s.experience else '',
-                s.shop_type.replace('_', ' ') if s.shop_type else '',
-                correct_total, total_q, pct,
-                i,
-                q.topic,
-                q.text,
-                "Choix multiple" if q.kind == "multi" else "Choix unique",
-                selected_labels,
-                correct_labels,
-                "OUI" if a.is_correct else "NON",
-                missing,
-                extra,
-            ])
-
-    out.seek(0)
     return StreamingResponse(
-        iter([out.getvalue()]),
+        reporting.iter_export_csv(),
         media_type="text/csv; charset=utf-8",
         headers={"Content-Disposition": "attachment; filename=podotest_resultats_detail.csv"},
     )
@@ -0,0 +1,134 @@
+"""Fichiers statiques versionnés par empreinte de contenu.
+
+Build (au déploiement) : python assets.py
+  → static/dist/<chemin>.<hash>.<ext> + variantes .gz / .br + manifest.json
+Les templates utilisent {{ asset('style.css') }} ; sans build (dev), l'URL
+retombe sur /static/style.css.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from typing import Dict
+
+from starlette.datastructures import Headers
+from starlette.staticfiles import StaticFiles
+
+try:  # brotli est optionnel : sans lui on ne produit que .gz
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+STATIC_DIR = "static"
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST = os.path.join(DIST_DIR, "manifest.json")
+URL_PREFIX = "/assets"
+
+# Formats déjà compressés (jpg, png…) : pas de variante
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".txt", ".json", ".pdf"}
+# On ne garde une variante que si elle fait gagner au moins 10 %
+MIN_GAIN = 0.9
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+# ── Build ─────────────────────────────────────────────────────────────────────
+
+def _hashed_name(rel: str, data: bytes) -> str:
+    root, ext = os.path.splitext(rel)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def build(static_dir: str = STATIC_DIR, dist_dir: str = DIST_DIR) -> Dict[str, str]:
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    manifest: Dict[str, str] = {}
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for name in files:
+            src = os.path.join(root, name)
+            rel = os.path.relpath(src, static_dir).replace(os.sep, "/")
+            with open(src, "rb") as fh:
+                data = fh.read()
+            hashed = _hashed_name(rel, data)
+            dst = os.path.join(dist_dir, hashed)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            with open(dst, "wb") as fh:
+                fh.write(data)
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    variants[".br"] = brotli.compress(data, quality=11)
+                for ext, blob in variants.items():
+                    if len(blob) <= len(data) * MIN_GAIN:
+                        with open(dst + ext, "wb") as fh:
+                            fh.write(blob)
+            manifest[rel] = hashed
+    with open(os.path.join(dist_dir, "manifest.json"), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=1, sort_keys=True)
+    return manifest
+
+
+# ── Exécution ─────────────────────────────────────────────────────────────────
+
+def load_manifest(path: str = MANIFEST) -> Dict[str, str]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+_manifest = load_manifest()
+
+
+def asset(path: str) -> str:
+    """URL versionnée d'un fichier de static/ (helper Jinja)."""
+    path = path.lstrip("/")
+    hashed = _manifest.get(path)
+    if hashed is None:
+        return f"/{STATIC_DIR}/{path}"
+    return f"{URL_PREFIX}/{hashed}"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """Sert static/dist : variante .br / .gz si acceptée, cache « immutable »."""
+
+    async def get_response(self, path: str, scope):
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accept:
+                continue
+            full, stat = self.lookup_path(path + ext)
+            if stat is None:
+                continue
+            response = await super().get_response(path + ext, scope)
+            # 304 : l'ETag est celui de la variante, à renvoyer tel quel
+            if response.status_code not in (200, 304):
+                continue
+            if response.status_code == 200:
+                media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                if media_type.startswith("text/") or media_type.endswith("javascript"):
+                    media_type += "; charset=utf-8"
+                response.headers["content-type"] = media_type
+                response.headers["content-encoding"] = encoding
+            self._cache_headers(response)
+            return response
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            self._cache_headers(response)
+        return response
+
+    @staticmethod
+    def _cache_headers(response) -> None:
+        response.headers["cache-control"] = IMMUTABLE
+        response.headers["vary"] = "Accept-Encoding"
+
+
+if __name__ == "__main__":
+    m = build()
+    print(f"✅ {len(m)} fichiers statiques versionnés dans {DIST_DIR}")
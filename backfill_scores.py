@@ -0,0 +1,79 @@
+"""Remplit les colonnes de score matérialisé des sessions existantes.
+
+Lancé automatiquement par les migrations (étape _sessions_score_history)
+quand des sessions soumises n'ont pas encore de score. Pour tout recalculer
+à la main : python backfill_scores.py
+"""
+from __future__ import annotations
+
+import json
+
+from sqlalchemy import Integer, func, select
+
+from db import SessionLocal, engine
+import bootstrap
+import grading
+from models import Answer, Session
+
+BATCH_SIZE = 1000
+
+
+def backfill(db) -> int:
+    """Recalcule correct_count / total_questions / score_pct / submitted_at."""
+    n = 0
+    last_id = 0
+    while True:
+        sessions = (
+            db.query(Session)
+            .filter(Session.id > last_id)
+            .order_by(Session.id.asc())
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        if not sessions:
+            break
+        ids = [s.id for s in sessions]
+        counts = {
+            sid: (int(total or 0), int(correct or 0))
+            for sid, total, correct in db.execute(
+                select(
+                    Answer.session_id,
+                    func.count(Answer.id),
+                    func.sum(func.cast(Answer.is_correct, Integer)),
+                )
+                .where(Answer.session_id.in_(ids))
+                .group_by(Answer.session_id)
+            )
+        }
+        for s in sessions:
+            n_answers, correct = counts.get(s.id, (0, 0))
+            try:
+                total_q = len(json.loads(s.question_ids_json or "[]"))
+            except Exception:
+                total_q = n_answers
+            if total_q == 0:
+                total_q = n_answers
+            s.correct_count = correct
+            s.total_questions = total_q
+            s.score_pct = grading.score_pct(correct, total_q)
+            if n_answers and s.submitted_at is None:
+                # Date de soumission inconnue pour l'historique : date de création
+                s.submitted_at = s.created_at
+        db.commit()
+        n += len(sessions)
+        last_id = ids[-1]
+    return n
+
+
+def main() -> None:
+    bootstrap.run(engine)
+    db = SessionLocal()
+    try:
+        n = backfill(db)
+    finally:
+        db.close()
+    print(f"✅ {n} sessions mises à jour")
+
+
+if __name__ == "__main__":
+    main()
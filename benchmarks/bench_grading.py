@@ -0,0 +1,75 @@
+"""Micro-benchmark du moteur de correction (grading.grade_form).
+
+Usage : python benchmarks/bench_grading.py [nb_soumissions]
+"""
+from __future__ import annotations
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from db import SessionLocal, engine  # noqa: E402
+import bootstrap  # noqa: E402
+import grading  # noqa: E402
+import question_bank  # noqa: E402
+import seed  # noqa: E402
+
+
+class _Form(dict):
+    """Équivalent minimal du FormData de Starlette."""
+
+    def getlist(self, key):
+        v = self.get(key)
+        return list(v) if isinstance(v, (list, tuple)) else ([v] if v else [])
+
+
+def _random_form(questions, rnd: random.Random) -> _Form:
+    form = _Form()
+    for q in questions:
+        ids = [c.id for c in q.choices]
+        if q.kind == "multi":
+            form[f"q{q.id}"] = rnd.sample(ids, rnd.randint(0, len(ids)))
+        else:
+            form[f"q{q.id}"] = rnd.choice(ids)
+    return form
+
+
+def main(n: int = 20000) -> None:
+    bootstrap.run(engine)
+    db = SessionLocal()
+    try:
+        bank = question_bank.get_bank(db)
+    finally:
+        db.close()
+
+    rnd = random.Random(42)
+    all_questions = list(bank.by_id.values())
+    nb = min(seed.NB_QUESTIONS, len(all_questions))
+    forms = []
+    for _ in range(n):
+        questions = rnd.sample(all_questions, nb)
+        forms.append((questions, _random_form(questions, rnd)))
+
+    t0 = time.perf_counter()
+    graded = 0
+    for questions, form in forms:
+        graded += len(grading.grade_form(questions, form))
+    t_grade = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for questions, form in forms:
+        for g in grading.grade_form(questions, form):
+            g.feedback()
+    t_full = time.perf_counter() - t0
+
+    print(f"soumissions       : {n} ({graded} questions)")
+    print(f"correction seule  : {graded / t_grade:,.0f} questions/s")
+    print(f"correction+détail : {graded / t_full:,.0f} questions/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,246 @@
+"""Micro-benchmarks des chemins coûteux selon le volume d'historique.
+
+Pour chaque taille (sessions), la base est complétée par gen_history puis on
+mesure :
+  dashboard  : load_page + dashboard_stats (page /admin), médiane et p95
+  export     : iter_export_csv complet, lignes/s et pic de mémoire (RSS),
+               dans un processus séparé pour isoler la mémoire
+  soumission : correction + écriture d'une soumission (comme submit_quiz)
+
+Usage : python benchmarks/bench_reporting.py [--sizes 1000,100000,1000000]
+                                             [--output res.json] [--compare ancien.json]
+
+Base : DATABASE_URL, sinon cache/bench/history.sqlite3 (conservée entre deux
+runs : seules les sessions manquantes sont générées).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+DEFAULT_DB = os.path.join(ROOT, "cache", "bench", "history.sqlite3")
+DASHBOARD_RUNS = 20
+SUBMISSIONS = 200
+
+
+def _ms(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "median_ms": round(statistics.median(values) * 1000, 2),
+        "p95_ms":    round(values[max(0, int(len(values) * 0.95) - 1)] * 1000, 2),
+    }
+
+
+def _rss_mb(field: str = "VmHWM") -> float:
+    """Mémoire du processus en Mo : VmHWM = pic, VmRSS = actuelle (Linux).
+
+    ru_maxrss sert de repli mais hérite du pic du parent sous Linux.
+    """
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ── Mesures ───────────────────────────────────────────────────────────────────
+
+def bench_dashboard(runs: int = DASHBOARD_RUNS) -> Dict[str, float]:
+    from db import SessionLocal
+    import reporting
+
+    times = []
+    for _ in range(runs):
+        db = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            reporting.load_page(db, limit=reporting.ADMIN_PAGE_SIZE)
+            reporting.dashboard_stats(db, reporting.STATS_WINDOW)
+            times.append(time.perf_counter() - t0)
+        finally:
+            db.close()
+    return _ms(times)
+
+
+def _export_child(queue) -> None:
+    from db import async_engine
+    import reporting
+
+    async def consume():
+        rows = size = 0
+        async for chunk in reporting.iter_export_csv():
+            rows += chunk.count("\n")
+            size += len(chunk.encode("utf-8"))
+        # Ferme les connexions du pool (sinon le thread aiosqlite bloque la sortie)
+        await async_engine.dispose()
+        return rows - 1, size        # sans l'en-tête
+
+    rss_before = _rss_mb("VmRSS")
+    t0 = time.perf_counter()
+    rows, size = asyncio.run(consume())
+    elapsed = time.perf_counter() - t0
+    queue.put({
+        "rows":         rows,
+        "seconds":      round(elapsed, 2),
+        "rows_per_s":   round(rows / elapsed),
+        "mb":           round(size / 1e6, 1),
+        "peak_rss_mb":  _rss_mb(),
+        "start_rss_mb": rss_before,
+    })
+
+
+def bench_export() -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_export_child, args=(queue,))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def _submit(db, token: str, form) -> None:
+    """Même travail que la route submit_quiz (seed.submit_answers), en synchrone."""
+    from sqlalchemy import select
+
+    import grading
+    import models
+    import question_bank
+    import seed
+
+    sess = db.scalar(select(models.Session).where(models.Session.token == token))
+    questions = question_bank.get_bank(db).pick(json.loads(sess.question_ids_json))
+    seed.submit_answers(db, sess, grading.grade_form(questions, form))
+    db.commit()
+
+
+def bench_submission(n: int = SUBMISSIONS) -> Dict[str, float]:
+    from sqlalchemy import select
+
+    from bench_grading import _random_form
+    from db import SessionLocal
+    import grading
+    import models
+    import question_bank
+    import seed
+
+    rnd = random.Random(7)
+    db = SessionLocal()
+    try:
+        bank = question_bank.get_bank(db)
+        # Sessions fraîches (hors chrono), comme après POST /quiz
+        cases = []
+        for _ in range(n):
+            token = seed.new_session(db, prenom="Bench", consent=True)
+            ids = json.loads(db.scalar(
+                select(models.Session.question_ids_json).where(models.Session.token == token)))
+            questions = bank.pick(ids)
+            cases.append((questions, token, _random_form(questions, rnd)))
+
+        t0 = time.perf_counter()
+        for questions, _, form in cases:
+            grading.grade_form(questions, form)
+        grade_us = (time.perf_counter() - t0) / n * 1e6
+
+        times = []
+        for _, token, form in cases:
+            t0 = time.perf_counter()
+            _submit(db, token, form)
+            times.append(time.perf_counter() - t0)
+    finally:
+        db.close()
+    return {"grade_us": round(grade_us, 1), **_ms(times)}
+
+
+# ── Exécution ─────────────────────────────────────────────────────────────────
+
+def _flat(results: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, float]:
+    return {
+        f"{size}/{bench}/{metric}": value
+        for size, benches in results.items()
+        for bench, metrics in benches.items()
+        for metric, value in metrics.items()
+        if isinstance(value, (int, float))
+    }
+
+
+def print_results(results, previous=None) -> None:
+    prev = _flat(previous) if previous else {}
+    for key, value in _flat(results).items():
+        line = f"  {key:42s} {value:>12,.2f}"
+        old = prev.get(key)
+        if old:
+            line += f"   ({(value - old) / old * 100:+.0f} % vs {old:,.2f})"
+        print(line)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", default="1000,100000,1000000")
+    p.add_argument("--output", help="enregistre les résultats (JSON)")
+    p.add_argument("--compare", help="résultats d'une version précédente (JSON)")
+    args = p.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        os.makedirs(os.path.dirname(DEFAULT_DB), exist_ok=True)
+        os.environ["DATABASE_URL"] = f"sqlite:///{DEFAULT_DB}"
+
+    from sqlalchemy import func, select
+
+    from db import engine
+    import bootstrap
+    import gen_history
+    import models
+
+    bootstrap.run(engine)
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for size in sorted(int(s) for s in args.sizes.split(",")):
+        with engine.connect() as conn:
+            have = conn.scalar(select(func.count(models.Session.id))) or 0
+        if have < size:
+            print(f"▶ génération de {size - have:,} sessions")
+            gen_history.generate(size - have, seed_value=size)
+        elif have > size * 1.1:
+            print(f"⚠️  la base contient déjà {have:,} sessions (> {size:,})")
+
+        print(f"▶ {size:,} sessions")
+        results[str(size)] = {
+            "dashboard":  bench_dashboard(),
+            "export":     bench_export(),
+            "submission": bench_submission(),
+        }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            previous = json.load(fh)["results"]
+    print()
+    print_results(results, previous)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump({"date": datetime.utcnow().isoformat(timespec="seconds"),
+                       "database": engine.dialect.name, "results": results},
+                      fh, indent=1)
+        print(f"✅ Résultats enregistrés dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
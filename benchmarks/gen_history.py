@@ -0,0 +1,185 @@
+"""Génère un historique synthétique (sessions + réponses) en insertions groupées.
+
+Usage : python benchmarks/gen_history.py NB_SESSIONS [--days 365] [--seed 42]
+        (cible : DATABASE_URL, SQLite local par défaut)
+
+Le mélange des profils et la justesse des réponses imitent la production :
+surtout des vendeurs, expérience variable, niveau lié au profil et à la
+difficulté propre de chaque question, ~15 % de quiz abandonnés.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import random
+import secrets
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from db import SessionLocal, engine  # noqa: E402
+import analytics  # noqa: E402
+import bootstrap  # noqa: E402
+import grading  # noqa: E402
+from models import Answer, Session  # noqa: E402
+import question_bank  # noqa: E402
+from question_bank import CachedQuestion  # noqa: E402
+import seed  # noqa: E402
+
+BATCH_SIZE = 5000
+
+# (valeur, poids, niveau) — le niveau s'ajoute à l'aptitude du candidat
+ROLES = [
+    ("vendeur",            0.55, 0.0),
+    ("responsable_rayon",  0.15, 0.3),
+    ("directeur_magasin",  0.08, 0.3),
+    ("podologue",          0.12, 1.2),
+    ("autre",              0.10, -0.3),
+]
+EXPERIENCES = [
+    ("moins_1_an", 0.30, -0.4),
+    ("1_3_ans",    0.35, 0.0),
+    ("3_5_ans",    0.20, 0.3),
+    ("plus_5_ans", 0.15, 0.5),
+]
+SHOP_TYPES = [
+    ("independant",        0.25, 0.1),
+    ("enseigne_nationale", 0.25, 0.0),
+    ("sport",              0.15, -0.1),
+    ("pharmacie",          0.15, 0.2),
+    ("grande_surface",     0.12, -0.2),
+    ("luxe",               0.05, 0.0),
+    ("autre",              0.03, 0.0),
+]
+PRENOMS = ["Marie", "Julie", "Camille", "Léa", "Sarah", "Thomas", "Nicolas",
+           "Lucas", "Hugo", "Emma", "Chloé", "Inès", "Karim", "Sophie", "Antoine"]
+NOMS = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit",
+        "Durand", "Leroy", "Moreau", "Simon", "Laurent", "Lefebvre", "Michel"]
+
+SUBMIT_RATE = 0.85      # part des sessions allant jusqu'à la soumission
+BLANK_RATE = 0.03       # question laissée sans réponse
+
+
+def _pick(rnd: random.Random, table: Sequence[Tuple[str, float, float]]) -> Tuple[str, float]:
+    value, _, level = rnd.choices(table, weights=[w for _, w, _ in table])[0]
+    return value, level
+
+
+def _difficulties(questions: Sequence[CachedQuestion], rnd: random.Random) -> Dict[int, float]:
+    # Les questions à choix multiples sont en moyenne plus difficiles
+    return {
+        q.id: rnd.gauss(0.8 if q.kind == "multi" else -0.6, 0.7)
+        for q in questions
+    }
+
+
+def _wrong_answer(q: CachedQuestion, rnd: random.Random) -> Tuple[str, ...]:
+    ids = [c.id for c in q.choices]
+    if q.kind != "multi":
+        return (rnd.choice([i for i in ids if i not in q.correct_set] or ids),)
+    # Multi : la bonne combinaison avec un choix en trop ou en moins
+    picked = set(q.correct_set)
+    while picked == q.correct_set:
+        picked ^= {rnd.choice(ids)}
+    return tuple(sorted(picked))
+
+
+def _session_rows(n: int, start: datetime, step: timedelta, questions: List[CachedQuestion],
+                  difficulty: Dict[int, float], quiz_id: int,
+                  rnd: random.Random) -> Tuple[List[dict], List[List[dict]]]:
+    sessions, answers = [], []
+    nb = min(seed.NB_QUESTIONS, len(questions))
+    for i in range(n):
+        role, l1 = _pick(rnd, ROLES)
+        experience, l2 = _pick(rnd, EXPERIENCES)
+        shop_type, l3 = _pick(rnd, SHOP_TYPES)
+        ability = l1 + l2 + l3 + rnd.gauss(0.6, 0.8)
+        chosen = rnd.sample(questions, nb)
+        created = start + step * i
+        row = {
+            "token": secrets.token_urlsafe(10), "quiz_id": quiz_id, "created_at": created,
+            "prenom": rnd.choice(PRENOMS), "nom": rnd.choice(NOMS), "consent": True,
+            "role": role, "experience": experience, "shop_type": shop_type,
+            "question_ids_json": json.dumps([q.id for q in chosen]),
+            "correct_count": 0, "total_questions": nb, "score_pct": 0, "submitted_at": None,
+        }
+        rows = []
+        if rnd.random() < SUBMIT_RATE:
+            for q in chosen:
+                if rnd.random() < BLANK_RATE:
+                    selected: Tuple[str, ...] = ()
+                elif rnd.random() < 1 / (1 + math.exp(difficulty[q.id] - ability)):
+                    selected = tuple(sorted(q.correct_set))
+                else:
+                    selected = _wrong_answer(q, rnd)
+                g = grading.grade(q, selected)
+                rows.append({"question_id": q.id, "is_correct": g.is_correct,
+                             "selected_json": list(g.selected_ids),
+                             "selected_mask": g.selected_mask})
+            correct = sum(1 for r in rows if r["is_correct"])
+            row.update(correct_count=correct, score_pct=grading.score_pct(correct, nb),
+                       submitted_at=created + timedelta(minutes=rnd.uniform(3, 15)))
+        sessions.append(row)
+        answers.append(rows)
+    return sessions, answers
+
+
+def generate(n: int, days: int = 365, seed_value: int = 42, verbose: bool = True) -> int:
+    """Ajoute n sessions à la base ; renvoie le nombre total de sessions."""
+    bootstrap.run(engine)
+    db = SessionLocal()
+    try:
+        quiz_id = seed.active_quiz_id(db)
+        questions = list(question_bank.get_bank(db).for_quiz(quiz_id))
+    finally:
+        db.close()
+
+    rnd = random.Random(seed_value)
+    difficulty = _difficulties(questions, random.Random(seed_value))
+    start = datetime.utcnow() - timedelta(days=days)
+    step = timedelta(days=days) / max(n, 1)
+    sessions_t, answers_t = Session.__table__, Answer.__table__
+
+    t0 = time.perf_counter()
+    done = 0
+    while done < n:
+        size = min(BATCH_SIZE, n - done)
+        sessions, answers = _session_rows(size, start + step * done, step,
+                                          questions, difficulty, quiz_id, rnd)
+        with engine.begin() as conn:
+            ids = conn.execute(
+                insert(sessions_t).returning(sessions_t.c.id, sort_by_parameter_order=True),
+                sessions,
+            ).scalars().all()
+            rows = [dict(a, session_id=sid) for sid, group in zip(ids, answers) for a in group]
+            if rows:
+                conn.execute(insert(answers_t), rows)
+        done += size
+        if verbose:
+            rate = done / (time.perf_counter() - t0)
+            print(f"\r  {done:>10,} / {n:,} sessions ({rate:,.0f}/s)", end="", flush=True)
+
+    # Agrégat par thème recalculé une fois pour tout l'historique ajouté
+    with engine.begin() as conn:
+        analytics.rebuild(conn)
+        total = conn.scalar(select(func.count(Session.id)))
+    if verbose:
+        print(f"\n✅ {n:,} sessions ajoutées en {time.perf_counter() - t0:.1f} s "
+              f"({total:,} au total)")
+    return total
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("sessions", type=int)
+    p.add_argument("--days", type=int, default=365, help="période couverte par l'historique")
+    p.add_argument("--seed", type=int, default=42)
+    args = p.parse_args()
+    generate(args.sessions, days=args.days, seed_value=args.seed)
@@ -0,0 +1,336 @@
+"""Test de charge de bout en bout : parcours candidat + lecteurs admin.
+
+Lance l'application (uvicorn) sur une base jetable, simule des candidats
+  GET /quiz → POST /quiz (consentement) → GET /t/{token} → POST /t/{token}
+en parallèle de lecteurs admin (tableau de bord + export CSV), puis affiche
+débit et latences p50/p95/p99 par route.
+
+Usage :
+  python benchmarks/loadtest.py [--candidates 20] [--admins 2] [--duration 30]
+                                [--workers 2] [--database-url URL] [--url URL]
+                                [--baseline FICHIER] [--save-baseline]
+
+Sans --database-url : SQLite dans un dossier temporaire. Avec --url : cible
+un serveur déjà lancé (rien n'est démarré). Code de sortie 1 en cas
+d'erreurs HTTP ou de régression par rapport à la baseline enregistrée.
+
+Baseline : benchmarks/loadtest_baseline.json (versionnée, paramètres par
+défaut). Les latences dépendent de la machine : sur une nouvelle machine de
+référence (CI), la réenregistrer une fois depuis la branche principale avec
+  python benchmarks/loadtest.py --save-baseline
+puis la committer ; les runs suivants s'y comparent automatiquement. Un run
+avec des erreurs n'est pas enregistré. Sur la base SQLite jetable, l'attente
+du verrou d'écriture (SQLITE_BUSY_TIMEOUT_MS, 60 s ici) compte dans les
+latences plutôt qu'en erreurs.
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "loadtest_baseline.json")
+
+# Une régression = p95 plus lent de TOLERANCE ET d'au moins MIN_DELTA_MS,
+# ou débit inférieur de TOLERANCE
+TOLERANCE = 0.25
+MIN_DELTA_MS = 5.0
+
+ROLES = ["vendeur", "responsable_rayon", "directeur_magasin", "podologue", "autre"]
+EXPERIENCES = ["moins_1_an", "1_3_ans", "3_5_ans", "plus_5_ans"]
+SHOP_TYPES = ["independant", "enseigne_nationale", "sport", "pharmacie",
+              "grande_surface", "luxe", "autre"]
+
+_CHOICE = re.compile(r'type="(radio|checkbox)" name="(q\d+)" value="([^"]+)"')
+
+
+# ── Mesures ───────────────────────────────────────────────────────────────────
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, route: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies[route].append(seconds * 1000)
+            if not ok:
+                self.errors[route] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            out[route] = {
+                "n":      len(values),
+                "rps":    round(len(values) / elapsed, 2),
+                "p50":    round(_percentile(values, 50), 2),
+                "p95":    round(_percentile(values, 95), 2),
+                "p99":    round(_percentile(values, 99), 2),
+                "errors": self.errors.get(route, 0),
+            }
+        return out
+
+
+def _percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, round(p / 100 * len(values) + 0.5) - 1))
+    return values[k]
+
+
+# ── Client HTTP minimal (une connexion persistante par utilisateur) ──────────
+
+class Client:
+    def __init__(self, base_url: str, recorder: Recorder) -> None:
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.recorder = recorder
+        self.cookies: Dict[str, str] = {}
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def request(self, route: str, method: str, path: str,
+                form: Optional[List[Tuple[str, str]]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        headers = {"Accept-Encoding": "identity"}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+
+        t0 = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+            data = resp.read()
+        except (OSError, http.client.HTTPException):
+            self.recorder.add(route, time.perf_counter() - t0, ok=False)
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            return 0, {}, b""
+        self.recorder.add(route, time.perf_counter() - t0, ok=resp.status < 400)
+
+        for value in resp.headers.get_all("set-cookie") or []:
+            name, _, rest = value.partition("=")
+            self.cookies[name.strip()] = rest.split(";", 1)[0]
+        return resp.status, {k.lower(): v for k, v in resp.getheaders()}, data
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# ── Scénarios ─────────────────────────────────────────────────────────────────
+
+def _answers(html: str, rnd: random.Random) -> List[Tuple[str, str]]:
+    by_question: Dict[str, Tuple[str, List[str]]] = {}
+    for kind, name, value in _CHOICE.findall(html):
+        by_question.setdefault(name, (kind, []))[1].append(value)
+    form = []
+    for name, (kind, values) in by_question.items():
+        if kind == "checkbox":
+            picked = rnd.sample(values, rnd.randint(1, len(values)))
+        else:
+            picked = [rnd.choice(values)]
+        form.extend((name, v) for v in picked)
+    return form
+
+
+def candidate(base_url: str, rec: Recorder, deadline: float, seed: int, think: float) -> None:
+    rnd = random.Random(seed)
+    c = Client(base_url, rec)
+    try:
+        while time.monotonic() < deadline:
+            c.request("GET /quiz", "GET", "/quiz")
+            status, headers, _ = c.request("POST /quiz", "POST", "/quiz", form=[
+                ("prenom", f"Charge{seed}"), ("nom", "Test"),
+                ("role", rnd.choice(ROLES)),
+                ("experience", rnd.choice(EXPERIENCES)),
+                ("shop_type", rnd.choice(SHOP_TYPES)),
+                ("consent", "on"),
+            ])
+            location = headers.get("location", "")
+            if status != 302 or not location.startswith("/t/"):
+                continue
+            _, _, html = c.request("GET /t/{token}", "GET", location)
+            time.sleep(think * rnd.random())
+            c.request("POST /t/{token}", "POST", location,
+                      form=_answers(html.decode("utf-8", "replace"), rnd))
+    finally:
+        c.close()
+
+
+def admin_reader(base_url: str, rec: Recorder, deadline: float, export_every: int) -> None:
+    c = Client(base_url, rec)
+    try:
+        c.request("POST /admin/login", "POST", "/admin/login", form=[("password", "admin")])
+        i = 0
+        while time.monotonic() < deadline:
+            c.request("GET /admin", "GET", "/admin")
+            i += 1
+            if export_every and i % export_every == 0:
+                c.request("GET /admin/export.csv", "GET", "/admin/export.csv")
+    finally:
+        c.close()
+
+
+# ── Serveur jetable ───────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, database_url: Optional[str], tmp: str) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL":     database_url or f"sqlite:///{os.path.join(tmp, 'loadtest.db')}",
+        "ADMIN_SECRET":     "loadtest",
+        "ITEM_CACHE_DIR":   os.path.join(tmp, "items"),
+        "SEARCH_CACHE_DIR": os.path.join(tmp, "search"),
+    })
+    # SQLite saturé (un seul écrivain) : l'attente du verrou doit se lire dans
+    # les latences, pas en erreurs 500 au bout des 5 s par défaut
+    env.setdefault("SQLITE_BUSY_TIMEOUT_MS", "60000")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit("❌ Le serveur s'est arrêté au démarrage")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return proc, base_url
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("❌ Le serveur ne répond pas sur /healthz")
+
+
+# ── Baseline ──────────────────────────────────────────────────────────────────
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float = TOLERANCE) -> List[str]:
+    problems = []
+    for route, base in baseline.items():
+        cur = current.get(route)
+        if cur is None:
+            problems.append(f"{route} : plus aucune requête")
+            continue
+        if cur["p95"] > base["p95"] * (1 + tolerance) and cur["p95"] - base["p95"] > MIN_DELTA_MS:
+            problems.append(f"{route} : p95 {base['p95']:.1f} → {cur['p95']:.1f} ms")
+        if cur["rps"] < base["rps"] * (1 - tolerance):
+            problems.append(f"{route} : débit {base['rps']:.1f} → {cur['rps']:.1f} req/s")
+    return problems
+
+
+def print_table(summary: Dict[str, Dict[str, float]], elapsed: float) -> None:
+    print(f"\n{'route':22s} {'req':>7s} {'req/s':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'err':>5s}")
+    for route, s in summary.items():
+        print(f"{route:22s} {s['n']:7d} {s['rps']:8.1f} {s['p50']:8.1f} "
+              f"{s['p95']:8.1f} {s['p99']:8.1f} {s['errors']:5d}")
+    total = sum(s["n"] for s in summary.values())
+    print(f"\ntotal : {total} requêtes en {elapsed:.1f} s ({total / elapsed:.1f} req/s), latences en ms")
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--candidates", type=int, default=20, help="candidats simultanés")
+    p.add_argument("--admins", type=int, default=2, help="lecteurs admin simultanés")
+    p.add_argument("--duration", type=float, default=30, help="durée en secondes")
+    p.add_argument("--think", type=float, default=0.0, help="temps de réponse max d'un candidat (s)")
+    p.add_argument("--export-every", type=int, default=5, help="un export CSV toutes les N pages admin")
+    p.add_argument("--workers", type=int, default=2, help="workers uvicorn (comme en production)")
+    p.add_argument("--database-url", help="base jetable (défaut : SQLite temporaire)")
+    p.add_argument("--url", help="serveur déjà lancé (aucun démarrage)")
+    p.add_argument("--baseline", default=DEFAULT_BASELINE)
+    p.add_argument("--save-baseline", action="store_true", help="enregistre ce run comme référence")
+    p.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="podotest-load-") as tmp:
+        proc = None
+        base_url = args.url
+        if base_url is None:
+            proc, base_url = start_server(args.workers, args.database_url, tmp)
+        try:
+            rec = Recorder()
+            deadline = time.monotonic() + args.duration
+            threads = [
+                threading.Thread(target=candidate, args=(base_url, rec, deadline, i, args.think))
+                for i in range(args.candidates)
+            ] + [
+                threading.Thread(target=admin_reader, args=(base_url, rec, deadline, args.export_every))
+                for _ in range(args.admins)
+            ]
+            print(f"⏱  {args.candidates} candidats + {args.admins} admins pendant "
+                  f"{args.duration:.0f} s sur {base_url}")
+            t0 = time.monotonic()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.monotonic() - t0
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+    summary = rec.summary(elapsed)
+    print_table(summary, elapsed)
+    failed = False
+
+    errors = sum(s["errors"] for s in summary.values())
+    if errors:
+        print(f"❌ {errors} requêtes en erreur")
+        failed = True
+
+    config = {k: getattr(args, k) for k in ("candidates", "admins", "duration", "think",
+                                           "export_every", "workers")}
+    if args.save_baseline and failed:
+        print("❌ Baseline non enregistrée : le run comporte des erreurs")
+    elif args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump({"config": config, "routes": summary}, fh, indent=1, sort_keys=True)
+        print(f"✅ Baseline enregistrée dans {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline.get("config") != config:
+            print("⚠️  Paramètres différents de ceux de la baseline : comparaison indicative")
+        problems = compare(summary, baseline["routes"], args.tolerance)
+        for line in problems:
+            print(f"❌ régression — {line}")
+        if problems:
+            failed = True
+        else:
+            print("✅ Pas de régression par rapport à la baseline")
+    else:
+        print(f"⚠️  Pas de baseline ({args.baseline}) : --save-baseline pour en créer une")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hashlib
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+
+from db import Base, SessionLocal
+import migrations
+from models import AppMeta
+import question_bank
+import search
+import seed
+
+
+# ── Bootstrap (schéma + seed) une seule fois par déploiement ─────────────────
+# Plusieurs workers démarrent en même temps : le premier prend un verrou
+# (advisory lock PostgreSQL, fichier verrou SQLite), crée/migre le schéma,
+# insère les questions et enregistre la version. Les suivants voient la
+# version à jour et sautent directement au chargement des caches.
+
+_LOCK_KEY = 0x706F646F  # "podo"
+VERSION_KEY = "bootstrap_version"
+
+
+def current_version() -> str:
+    """Empreinte du schéma déclaré (tables, colonnes, index) + migrations + seed."""
+    h = hashlib.sha1()
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        h.update(table.name.encode())
+        for col in table.columns:
+            h.update(f"{col.name}:{col.type}".encode())
+        for ix in sorted(table.indexes, key=lambda i: i.name or ""):
+            h.update(f"ix:{ix.name}".encode())
+    return f"m{len(migrations.STEPS)}-s{seed.SEED_VERSION}-{h.hexdigest()[:12]}"
+
+
+def _stored_version(engine: Engine) -> Optional[str]:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(AppMeta.__tablename__):
+            return None
+        return conn.execute(
+            select(AppMeta.value).where(AppMeta.key == VERSION_KEY)
+        ).scalar()
+
+
+@contextmanager
+def _lock(engine: Engine) -> Iterator[None]:
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_KEY})
+                conn.commit()
+        return
+
+    path = engine.url.database
+    try:
+        import fcntl
+    except ImportError:  # Windows : un seul processus en dev
+        fcntl = None
+    if not path or path == ":memory:" or fcntl is None:
+        yield
+        return
+    with open(f"{path}.bootstrap.lock", "w") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _bootstrap(engine: Engine, version: str) -> None:
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("CREATE SCHEMA IF NOT EXISTS public"))
+    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+    db = SessionLocal()
+    try:
+        seed.ensure_questions(db, sync=True)
+        meta = db.get(AppMeta, VERSION_KEY)
+        if meta is None:
+            db.add(AppMeta(key=VERSION_KEY, value=version))
+        else:
+            meta.value = version
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(engine: Engine) -> bool:
+    """Prépare la base si besoin ; renvoie True si le bootstrap a été exécuté."""
+    version = current_version()
+    ran = False
+    if _stored_version(engine) != version:
+        with _lock(engine):
+            # Un autre worker a pu terminer pendant qu'on attendait le verrou
+            if _stored_version(engine) != version:
+                _bootstrap(engine, version)
+                ran = True
+
+    # Caches du processus (lecture seule)
+    db = SessionLocal()
+    try:
+        seed.ensure_questions(db)
+        bank = question_bank.load(db)
+    finally:
+        db.close()
+    # Index de recherche : relu sur disque s'il correspond encore aux sources
+    search.load(bank)
+    return ran
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Mapping, Sequence, Tuple
+
+
+# ── Ensembles de choix en bitmask ─────────────────────────────────────────────
+# bit k = k-ième choix de la question (ordre de choices_json), comme la
+# matrice d'item_analysis. Clé de correction (Question.correct_mask) et
+# sélection (Answer.selected_mask) tiennent dans un petit entier :
+#   juste    : selected == correct
+#   manquant : correct & ~selected
+#   en trop  : selected & ~correct
+
+MAX_CHOICES = 8      # un octet (choices.u1 d'item_analysis)
+
+
+def bits(choice_ids: Sequence[str]) -> Dict[str, int]:
+    """id de choix → bit, dans l'ordre des choix."""
+    if len(choice_ids) > MAX_CHOICES:
+        raise ValueError(f"{len(choice_ids)} choix : au plus {MAX_CHOICES} par question")
+    return {cid: 1 << k for k, cid in enumerate(choice_ids)}
+
+
+def encode(bit_of: Mapping[str, int], ids: Iterable[str]) -> int:
+    """Ids cochés → bitmask ; les ids inconnus n'y figurent pas (à l'appelant
+    de les traiter, cf. grading.grade)."""
+    mask = 0
+    for cid in ids:
+        mask |= bit_of.get(cid, 0)
+    return mask
+
+
+def decode(choice_ids: Sequence[str], mask: int) -> Tuple[str, ...]:
+    """Bitmask → ids, dans l'ordre des choix."""
+    return tuple(cid for k, cid in enumerate(choice_ids) if mask >> k & 1)
+
+
+def table(values: Sequence[Any]) -> Tuple[Tuple[Any, ...], ...]:
+    """Pour chaque bitmask possible (2^n), les valeurs des choix cochés."""
+    return tuple(decode(values, mask) for mask in range(1 << len(values)))
+
+
+def correct_mask(choices: Sequence[Mapping[str, Any]]) -> int:
+    """Clé de correction d'une question à partir de choices_json."""
+    return sum(1 << k for k, c in enumerate(choices) if c.get("is_correct"))
+
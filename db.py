@@ -1,6 +1,8 @@
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 _db_url = os.environ.get("DATABASE_URL", "sqlite:///./podotest.sqlite3")
 
@@ -10,23 +12,102 @@ if _db_url.startswith("postgres://"):
 _is_sqlite = _db_url.startswith("sqlite")
 _connect_args = {"check_same_thread": False} if _is_sqlite else {}
 
-engine = create_engine(_db_url, connect_args=_connect_args)
+# ── Pool de connexions (réglable par variables d'environnement) ──────────────
+# pre_ping + recycle évitent les connexions mortes après une période d'inactivité
+# sur le PostgreSQL hébergé.
+_pool_kwargs = {
+    "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "1") not in ("0", "false", "no"),
+    "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+}
+# SQLite en mémoire (sqlite://) utilise un pool à connexion unique, sans taille
+_is_memory = _is_sqlite and (":memory:" in _db_url or _db_url.rstrip("/") == "sqlite:")
+if not _is_memory:
+    _pool_kwargs.update(
+        pool_size=int(os.environ.get("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=int(os.environ.get("DB_POOL_TIMEOUT", "30")),
+    )
 
-# Sur PostgreSQL, s'assurer que le schéma public existe
-if not _is_sqlite:
-    with engine.connect() as conn:
-        conn.execute(text("CREATE SCHEMA IF NOT EXISTS public"))
-        conn.execute(text("SET search_path TO public"))
-        conn.commit()
+engine = create_engine(_db_url, connect_args=_connect_args, **_pool_kwargs)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# Moteur asynchrone pour les routes (asyncpg sur PostgreSQL, aiosqlite en local).
+# Le moteur synchrone reste utilisé pour le démarrage (tables, seed) et les scripts.
+def _async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    driver = "sqlite+aiosqlite" if scheme.startswith("sqlite") else "postgresql+asyncpg"
+    return f"{driver}://{rest}"
+
+_async_pool_kwargs = dict(_pool_kwargs)
+if _is_sqlite and "pool_size" in _pool_kwargs:
+    # aiosqlite utilise NullPool par défaut : on garde un vrai pool réglable
+    _async_pool_kwargs["poolclass"] = AsyncAdaptedQueuePool
+
+async_engine = create_async_engine(_async_url(_db_url), **_async_pool_kwargs)
+
+# ── SQLite : WAL + attente sur verrou (soumissions concurrentes en local) ────
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cur = dbapi_connection.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA cache_size=-16000")   # ~16 Mo
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.close()
+
+if _is_sqlite:
+    event.listen(engine, "connect", _sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+
+def pool_status(eng) -> dict:
+    """Compteurs du pool (connexions libres / empruntées / en débordement)."""
+    pool = eng.pool
+    return {
+        "class":       type(pool).__name__,
+        "size":        pool.size() if hasattr(pool, "size") else None,
+        "checked_in":  pool.checkedin() if hasattr(pool, "checkedin") else None,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "overflow":    pool.overflow() if hasattr(pool, "overflow") else None,
+    }
+
+# expire_on_commit=False : pas de rechargement implicite (lazy load) après commit
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False,
+                                       expire_on_commit=False)
+
 class Base(DeclarativeBase):
     pass
 
+def upsert(db, table, rows, index_elements, update_columns, increment=False):
+    """INSERT … ON CONFLICT DO UPDATE en une seule requête (PostgreSQL / SQLite).
+
+    increment=True additionne les valeurs au lieu de les remplacer (compteurs).
+    """
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={
+            c: (table.c[c] + stmt.excluded[c]) if increment else stmt.excluded[c]
+            for c in update_columns
+        },
+    )
+    db.execute(stmt)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
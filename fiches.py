@@ -0,0 +1,196 @@
+"""Fiches PDF : envoi avec Range / ETag et dérivés légers préparés au build.
+
+Build (au déploiement) : python fiches.py
+  → build/fiches/<slug>/preview.jpg  (1re page, pour affichage immédiat)
+                        web.pdf      (version recompressée, si plus légère)
+                        texte.txt    (texte extrait, pour la recherche)
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+FICHES_DIR = os.path.join("static", "fiches")
+BUILD_DIR = os.path.join("build", "fiches")
+CACHE_CONTROL = "public, max-age=86400"
+CHUNK_SIZE = 64 * 1024
+
+PREVIEW_WIDTH = 480
+PREVIEW_QUALITY = 60
+
+
+@dataclass(frozen=True)
+class Fiche:
+    slug: str
+    title: str
+    filename: str
+
+    @property
+    def path(self) -> str:
+        return os.path.join(FICHES_DIR, self.filename)
+
+    def derived(self, name: str) -> str:
+        return os.path.join(BUILD_DIR, self.slug, name)
+
+
+FICHES: Tuple[Fiche, ...] = (
+    Fiche("hallux-valgus",     "Hallux Valgus",         "Hallux_Valgus.pdf"),
+    Fiche("mycose",            "Mycose & Hyperhidrose", "Mycose___Hyperidrose.pdf"),
+    Fiche("epine-calcaneenne", "Épine calcanéenne",     "Epine_calcaneenne.pdf"),
+    Fiche("ongle-incarne",     "Ongle incarné",         "L_ongle_incarne.pdf"),
+    Fiche("pied-plat",         "Pied plat",             "fiche_pied_plat.pdf"),
+    Fiche("pied-creux",        "Pied creux",            "Fiche_pied_creux.pdf"),
+    Fiche("griffes-orteils",   "Griffes d'orteils",     "Griffes_d_orteils.pdf"),
+    Fiche("varices-oedemes",   "Varices & Œdèmes",      "Varices_oedeme.pdf"),
+    Fiche("genu-valgum-varum", "Genu valgum / varum",   "Genu_valgum_varum_PDF.pdf"),
+    Fiche("cors-durillons",    "Cors & Durillons",      "Les_cors.pdf"),
+    Fiche("verrues",           "Verrues plantaires",    "Verrues.pdf"),
+)
+BY_SLUG: Dict[str, Fiche] = {f.slug: f for f in FICHES}
+
+
+# ── Envoi de fichier : ETag, 304, Range ──────────────────────────────────────
+
+_etags: Dict[Tuple[str, int, int], str] = {}
+
+
+def _etag(path: str, st: os.stat_result) -> str:
+    key = (path, st.st_mtime_ns, st.st_size)
+    etag = _etags.get(key)
+    if etag is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+        etag = _etags[key] = f'"{h.hexdigest()[:32]}"'
+    return etag
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        return inm.strip() == "*" or etag in {t.strip().removeprefix("W/") for t in inm.split(",")}
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Premier intervalle de « bytes=a-b » ; None si absent ou illisible."""
+    m = re.fullmatch(r"\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*(?:,.*)?", header)
+    if not m or (not m.group(1) and not m.group(2)):
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = int(m.group(2)) if m.group(2) else size - 1
+    else:  # suffixe : les N derniers octets
+        start = max(size - int(m.group(2)), 0)
+        end = size - 1
+    return start, min(end, size - 1)
+
+
+def _iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            block = fh.read(min(CHUNK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def send_file(request: Request, path: str, media_type: str,
+              filename: Optional[str] = None,
+              cache_control: str = CACHE_CONTROL) -> Response:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return Response("Fichier introuvable", status_code=404)
+
+    etag = _etag(path, st)
+    headers = {
+        "ETag":          etag,
+        "Last-Modified": formatdate(st.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+    if _not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    size = st.st_size
+    start, end = 0, size - 1
+    status = 200
+    rng = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if rng and (if_range is None or if_range.strip() == etag):
+        parsed = _parse_range(rng, size)
+        if parsed is not None:
+            start, end = parsed
+            if start >= size or start > end:
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+    if request.method == "HEAD":
+        return Response(status_code=status, headers=headers, media_type=media_type)
+    return StreamingResponse(_iter_file(path, start, length), status_code=status,
+                             headers=headers, media_type=media_type)
+
+
+def web_pdf_path(f: Fiche) -> str:
+    """Version allégée si le build l'a produite, sinon le PDF d'origine."""
+    web = f.derived("web.pdf")
+    return web if os.path.exists(web) else f.path
+
+
+# ── Build des dérivés ─────────────────────────────────────────────────────────
+
+def build(fiches: Tuple[Fiche, ...] = FICHES) -> None:
+    import pymupdf  # dépendance de build uniquement
+
+    for f in fiches:
+        os.makedirs(os.path.join(BUILD_DIR, f.slug), exist_ok=True)
+        with pymupdf.open(f.path) as doc:
+            page = doc[0]
+            zoom = PREVIEW_WIDTH / page.rect.width
+            pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+            with open(f.derived("preview.jpg"), "wb") as fh:
+                fh.write(pix.tobytes(output="jpeg", jpg_quality=PREVIEW_QUALITY))
+
+            with open(f.derived("texte.txt"), "w", encoding="utf-8") as fh:
+                fh.write("\n".join(p.get_text() for p in doc))
+
+            if hasattr(doc, "rewrite_images"):
+                doc.rewrite_images(dpi_threshold=150, dpi_target=110, quality=65)
+            web = doc.tobytes(garbage=4, deflate=True, deflate_images=True, clean=True)
+
+        # On ne garde la version web que si elle allège vraiment le fichier
+        if len(web) < os.path.getsize(f.path) * 0.9:
+            with open(f.derived("web.pdf"), "wb") as fh:
+                fh.write(web)
+        elif os.path.exists(f.derived("web.pdf")):
+            os.remove(f.derived("web.pdf"))
+        print(f"  {f.slug:20s} {os.path.getsize(f.path) // 1024:6d} Ko → "
+              f"{len(web) // 1024:6d} Ko")
+
+
+if __name__ == "__main__":
+    build()
+    print(f"✅ {len(FICHES)} fiches préparées dans {BUILD_DIR}")
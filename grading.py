@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from question_bank import CachedQuestion
+
+
+# ── Correction des réponses ───────────────────────────────────────────────────
+# Une seule passe par question : la sélection est lue une fois, réduite à un
+# bitmask (choice_mask) et comparée à la clé compilée (CachedQuestion.
+# correct_mask) ; le même résultat sert à la fois aux lignes Answer à
+# enregistrer et au détail affiché (done, admin, CSV). Un id qui n'est pas
+# un choix de la question rend la réponse fausse.
+
+@dataclass(frozen=True)
+class Graded:
+    question: CachedQuestion
+    selected_ids: Tuple[str, ...]      # tels que soumis, triés
+    selected_mask: int                 # choix connus seulement
+    is_correct: bool
+
+    def feedback(self) -> Dict[str, Any]:
+        """Détail lisible : labels choisis / attendus, manquants, en trop."""
+        q = self.question
+        selected, correct = self.selected_mask, q.correct_mask
+        return {
+            "topic":           q.topic,
+            "text":            q.text,
+            "kind":            q.kind,
+            "is_correct":      self.is_correct,
+            "selected_labels": q.labels_of(selected) + self.unknown_ids,
+            "correct_labels":  q.labels_of(correct),
+            # Pour multi : quelles réponses manquaient ou étaient en trop
+            "missing":         q.labels_of(correct & ~selected),
+            "extra":           q.labels_of(selected & ~correct) + self.unknown_ids,
+        }
+
+    @property
+    def unknown_ids(self) -> List[str]:
+        """Ids soumis qui ne sont pas des choix de la question."""
+        bits = self.question.bits
+        return [i for i in self.selected_ids if i not in bits]
+
+
+def read_selection(form: Any, q: CachedQuestion) -> Tuple[str, ...]:
+    """Choix cochés pour une question dans le formulaire soumis."""
+    key = f"q{q.id}"
+    if q.kind == "multi":
+        return tuple(sorted(str(x) for x in form.getlist(key)))
+    v = form.get(key, "")
+    return (str(v),) if v else ()
+
+
+def grade(q: CachedQuestion, selected_ids: Sequence[str]) -> Graded:
+    selected = tuple(sorted(selected_ids))
+    bits, mask, known = q.bits, 0, True
+    for i in selected:
+        bit = bits.get(i)
+        if bit is None:
+            known = False
+        else:
+            mask |= bit
+    return Graded(q, selected, mask, known and mask == q.correct_mask)
+
+
+def grade_form(questions: Iterable[CachedQuestion], form: Any) -> List[Graded]:
+    return [grade(q, read_selection(form, q)) for q in questions]
+
+
+def score_pct(correct: int, total: int) -> int:
+    return round(correct / total * 100) if total else 0
+
+
+def stored(q: CachedQuestion, selected_mask: int, is_correct: bool,
+           selected_ids: Optional[Sequence[str]] = None) -> Graded:
+    """Résultat déjà enregistré (Answer) — on garde is_correct tel quel.
+
+    selected_ids (Answer.selected) seulement quand needs_ids : sinon la
+    sélection se relit dans le bitmask.
+    """
+    mask = selected_mask or 0
+    ids = q.ids(mask) if selected_ids is None else tuple(sorted(str(i) for i in selected_ids))
+    return Graded(q, ids, mask, bool(is_correct))
+
+
+def needs_ids(q: CachedQuestion, selected_mask: int, is_correct: bool) -> bool:
+    """Réponse fausse dont le bitmask vaut la clé : un id inconnu a été soumis
+    (il n'a pas de bit), seul Answer.selected permet de l'afficher."""
+    return not is_correct and (selected_mask or 0) == q.correct_mask
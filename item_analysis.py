@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session as OrmSession
+
+from models import Answer
+import query_guard
+import question_bank
+from question_bank import QuestionBank
+
+
+# ── Analyse des items (qualité des questions) ────────────────────────────────
+# Matrice compacte session × question, stockée sur disque et lue en memmap :
+#   correct.i1  int8   -1 = non posée, 0 = fausse, 1 = juste
+#   choices.u1  uint8  Answer.selected_mask (bit k = k-ième choix, cf. choice_mask)
+#   sessions.i4 int32  session_id de chaque ligne
+# meta.json garde l'ordre des colonnes et le dernier Answer.id intégré : les
+# nouvelles soumissions sont ajoutées sans relire tout l'historique. Une
+# resoumission réécrit les lignes existantes (même id) : elles sont relues
+# via Answer.updated_at depuis la mise à jour précédente, moins une marge
+# (transactions concurrentes). Réintégrer une réponse est idempotent.
+
+CACHE_DIR = os.environ.get("ITEM_CACHE_DIR", os.path.join(".", "cache", "items"))
+READ_BATCH = 50_000
+# En dessous, les indicateurs sont trop bruités pour signaler une question
+MIN_RESPONSES = 30
+UPDATE_MARGIN = timedelta(minutes=5)
+
+_lock = threading.Lock()
+
+
+def _path(name: str) -> str:
+    return os.path.join(CACHE_DIR, name)
+
+
+@contextmanager
+def _file_lock() -> Iterator[None]:
+    """Un seul processus à la fois met à jour le cache (plusieurs workers)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        import fcntl
+    except ImportError:  # Windows : un seul processus en dev
+        fcntl = None
+    with _lock, open(_path("lock"), "w") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _read_meta() -> Optional[Dict[str, Any]]:
+    try:
+        with open(_path("meta.json"), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta: Dict[str, Any]) -> None:
+    tmp = _path("meta.json.tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, _path("meta.json"))
+
+
+def _reset(question_ids: List[int]) -> Dict[str, Any]:
+    for name in ("correct.i1", "choices.u1", "sessions.i4"):
+        open(_path(name), "wb").close()
+    meta = {"question_ids": question_ids, "last_answer_id": 0, "n_rows": 0,
+            "updated_since": None}
+    _write_meta(meta)
+    return meta
+
+
+def _open(meta: Dict[str, Any], mode: str = "r"):
+    n, q = meta["n_rows"], len(meta["question_ids"])
+    if n == 0:
+        return (np.zeros((0, q), np.int8), np.zeros((0, q), np.uint8), np.zeros(0, np.int32))
+    return (
+        np.memmap(_path("correct.i1"), np.int8, mode, shape=(n, q)),
+        np.memmap(_path("choices.u1"), np.uint8, mode, shape=(n, q)),
+        np.memmap(_path("sessions.i4"), np.int32, mode, shape=(n,)),
+    )
+
+
+def refresh(db: OrmSession) -> Dict[str, Any]:
+    """Intègre les réponses arrivées depuis la dernière mise à jour."""
+    bank = question_bank.get_bank(db)
+    question_ids = sorted(bank.by_id)
+    col = {qid: j for j, qid in enumerate(question_ids)}
+
+    with _file_lock():
+        meta = _read_meta()
+        if (meta is None or meta["question_ids"] != question_ids
+                or "updated_since" not in meta):
+            # Banque de questions modifiée (ou cache sans suivi des
+            # resoumissions) : on reconstruit tout
+            meta = _reset(question_ids)
+        started = datetime.utcnow()
+
+        _, _, sessions = _open(meta)
+        row_of = {int(sid): i for i, sid in enumerate(sessions)}
+        del sessions
+
+        with query_guard.batched():
+            while True:
+                rows = db.execute(
+                    select(Answer.id, Answer.session_id, Answer.question_id,
+                           Answer.selected_mask, Answer.is_correct)
+                    .where(Answer.id > meta["last_answer_id"])
+                    .order_by(Answer.id.asc())
+                    .limit(READ_BATCH)
+                ).all()
+                if not rows:
+                    break
+                _integrate(meta, rows, row_of, col)
+                meta["last_answer_id"] = rows[-1][0]
+                _write_meta(meta)
+
+            if meta["updated_since"] is not None:
+                since = datetime.fromisoformat(meta["updated_since"]) - UPDATE_MARGIN
+                rows = db.execute(
+                    select(Answer.id, Answer.session_id, Answer.question_id,
+                           Answer.selected_mask, Answer.is_correct)
+                    .where(Answer.updated_at >= since,
+                           Answer.id <= meta["last_answer_id"])
+                ).all()
+                if rows:
+                    _integrate(meta, rows, row_of, col)
+            meta["updated_since"] = started.isoformat()
+            _write_meta(meta)
+    return meta
+
+
+def _integrate(meta, rows, row_of, col) -> None:
+    q = len(meta["question_ids"])
+    # Nouvelles sessions → nouvelles lignes ajoutées en fin de fichier
+    new_sids = [sid for sid in dict.fromkeys(r[1] for r in rows) if sid not in row_of]
+    if new_sids:
+        base = meta["n_rows"]
+        for i, sid in enumerate(new_sids):
+            row_of[sid] = base + i
+        with open(_path("correct.i1"), "ab") as fh:
+            fh.write(np.full((len(new_sids), q), -1, np.int8).tobytes())
+        with open(_path("choices.u1"), "ab") as fh:
+            fh.write(np.zeros((len(new_sids), q), np.uint8).tobytes())
+        with open(_path("sessions.i4"), "ab") as fh:
+            fh.write(np.asarray(new_sids, np.int32).tobytes())
+        meta["n_rows"] = base + len(new_sids)
+
+    r_idx, c_idx, correct, mask = [], [], [], []
+    for _, sid, qid, selected_mask, is_correct in rows:
+        j = col.get(qid)
+        if j is None:
+            continue
+        r_idx.append(row_of[sid])
+        c_idx.append(j)
+        correct.append(1 if is_correct else 0)
+        mask.append(selected_mask)
+
+    if r_idx:
+        C, B, _ = _open(meta, "r+")
+        C[r_idx, c_idx] = correct
+        B[r_idx, c_idx] = mask
+        C.flush()
+        B.flush()
+
+
+# ── Statistiques vectorisées ─────────────────────────────────────────────────
+
+def _centered(R: np.ndarray, A: np.ndarray, n: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """R centré par colonne sur les lignes où A est vrai (0 ailleurs), et
+    somme des carrés : calculés une fois, partagés par toutes les corrélations."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mr = np.sum(R * A, axis=0, dtype=np.float64) / n
+    dr = R - np.nan_to_num(mr).astype(np.float32)
+    dr *= A
+    return dr, np.sum(dr * dr, axis=0, dtype=np.float64)
+
+
+def _point_biserial(x: np.ndarray, dr: np.ndarray, ssr: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """Corrélation colonne par colonne entre x (0/1, nul hors des questions
+    posées) et le score centré dr. x étant binaire, sa variance se déduit de
+    sa somme et la covariance vaut Σ x·dr : une seule matrice temporaire."""
+    sx = np.sum(x, axis=0, dtype=np.float64)
+    cov = np.sum(x * dr, axis=0, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = cov / np.sqrt(sx * (1 - sx / n) * ssr)
+    return np.where(np.isfinite(r), r, np.nan)
+
+
+def compute(C: np.ndarray, B: np.ndarray, n_choices: int = 8) -> Dict[str, np.ndarray]:
+    """Difficulté, discrimination et taux de sélection de chaque choix.
+
+    C : (n, q) int8 (-1/0/1), B : (n, q) uint8 bitmask des choix cochés.
+    Mémoire : quelques matrices (n, q), jamais de tenseur (n, q, k) ; les
+    choix sont traités bit par bit.
+    """
+    A = C >= 0
+    X = np.where(A, C, 0).astype(np.float32)
+    asked = A.sum(axis=1, dtype=np.float32)
+    total = X.sum(axis=1)
+    # Score « reste » : proportion de bonnes réponses aux autres questions posées
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rest = (total[:, None] - X) / (asked[:, None] - 1)
+    rest[~np.isfinite(rest)] = 0
+
+    n = A.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p_value = X.sum(axis=0) / n
+    dr, ssr = _centered(rest, A, n)
+    del rest
+    discrimination = _point_biserial(X, dr, ssr, n)
+    del X
+
+    # Taux et corrélation par choix : une tranche (n, q) par bit
+    choice_rate = np.empty((C.shape[1], n_choices))
+    choice_disc = np.empty((C.shape[1], n_choices))
+    for k in range(n_choices):
+        S = ((B >> k) & A).astype(np.float32)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            choice_rate[:, k] = S.sum(axis=0, dtype=np.float64) / n
+        choice_disc[:, k] = _point_biserial(S, dr, ssr, n)
+
+    return {
+        "n": n,
+        "p_value": p_value,
+        "discrimination": discrimination,
+        "choice_rate": choice_rate,
+        "choice_discrimination": choice_disc,
+    }
+
+
+def _f(v) -> Optional[float]:
+    v = float(v)
+    return None if np.isnan(v) else round(v, 3)
+
+
+def report(db: OrmSession) -> List[Dict[str, Any]]:
+    """Met le cache à jour puis renvoie les statistiques par question."""
+    meta = refresh(db)
+    bank: QuestionBank = question_bank.get_bank(db)
+    C, B, _ = _open(meta)
+    n_choices = max((len(q.choices) for q in bank.by_id.values()), default=1)
+    stats = compute(np.asarray(C), np.asarray(B), n_choices=n_choices)
+
+    out = []
+    for j, qid in enumerate(meta["question_ids"]):
+        q = bank.get(qid)
+        if q is None:
+            continue
+        p, d = _f(stats["p_value"][j]), _f(stats["discrimination"][j])
+        choices = [
+            {
+                "id":             c.id,
+                "label":          c.label,
+                "is_correct":     c.is_correct,
+                "rate":           _f(stats["choice_rate"][j, k]),
+                "discrimination": _f(stats["choice_discrimination"][j, k]),
+            }
+            for k, c in enumerate(q.choices)
+        ]
+        flags = []
+        enough = stats["n"][j] >= MIN_RESPONSES
+        if enough and p is not None and p > 0.9:
+            flags.append("trop facile")
+        if enough and p is not None and p < 0.2:
+            flags.append("trop difficile")
+        if enough and d is not None and d < 0.2:
+            flags.append("peu discriminante")
+        for c in choices:
+            if not enough or c["is_correct"] or c["rate"] is None:
+                continue
+            if c["rate"] < 0.05:
+                flags.append(f"distracteur {c['id']} jamais choisi")
+            elif c["discrimination"] is not None and c["discrimination"] > 0.1:
+                flags.append(f"distracteur {c['id']} attire les meilleurs")
+        out.append({
+            "id": qid, "topic": q.topic, "text": q.text, "kind": q.kind,
+            "n": int(stats["n"][j]), "p_value": p, "discrimination": d,
+            "choices": choices, "flags": flags,
+        })
+    return out
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# ── Métriques (format texte Prometheus sur /metrics) ────────────────────────
+# Compteurs en mémoire, par processus : chaque worker uvicorn expose les
+# siens avec un label « worker » (pid). Coût par requête : deux
+# perf_counter, un verrou et quelques additions ; par requête SQL : deux
+# perf_counter via les événements du moteur.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+RENDER_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+
+WORKER = str(os.getpid())
+_started = time.time()
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)   # dernier = +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+@dataclass
+class _Request:
+    """Compteurs SQL de la requête HTTP en cours (via contextvar)."""
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+@dataclass
+class _Registry:
+    requests: Dict[Tuple[str, str, str], int] = field(default_factory=lambda: defaultdict(int))
+    latency: Dict[Tuple[str, str], Histogram] = field(default_factory=dict)
+    db_queries: Dict[Tuple[str, str], Histogram] = field(default_factory=dict)
+    db_seconds: Dict[Tuple[str, str], float] = field(default_factory=lambda: defaultdict(float))
+    render: Dict[str, Histogram] = field(default_factory=dict)
+    # Requêtes SQL hors requête HTTP (démarrage, scripts)
+    background_queries: int = 0
+    background_seconds: float = 0.0
+    in_flight: int = 0
+
+
+_registry = _Registry()
+_lock = threading.Lock()
+_current: contextvars.ContextVar[Optional[_Request]] = contextvars.ContextVar("metrics_request", default=None)
+
+
+# ── SQL : événements du moteur ───────────────────────────────────────────────
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("metrics_t0")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    req = _current.get()
+    if req is not None:
+        req.queries += 1
+        req.db_seconds += elapsed
+    else:
+        with _lock:
+            _registry.background_queries += 1
+            _registry.background_seconds += elapsed
+
+
+def instrument_engine(engine: Engine) -> None:
+    """À appeler une fois par moteur (db.engine, async_engine.sync_engine)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ── Templates : durée de rendu ───────────────────────────────────────────────
+
+class TimedTemplate(Template):
+    """Template Jinja qui mesure son rendu (env.template_class)."""
+
+    def render(self, *args, **kwargs) -> str:
+        t0 = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - t0
+            name = self.name or "<string>"
+            with _lock:
+                h = _registry.render.get(name)
+                if h is None:
+                    h = _registry.render[name] = Histogram(RENDER_BUCKETS)
+                h.observe(elapsed)
+
+
+# ── Requêtes HTTP : middleware ASGI ──────────────────────────────────────────
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mount (/static, /assets) : préfixe du montage ; sinon aucune route
+    return scope.get("root_path") or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Compte les requêtes, leur latence et leurs requêtes SQL par route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        req = _Request()
+        token = _current.set(req)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        with _lock:
+            _registry.in_flight += 1
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - t0
+            _current.reset(token)
+            _record(scope["method"], _route_label(scope), status, elapsed, req)
+
+
+def _record(method: str, route: str, status: int, elapsed: float, req: _Request) -> None:
+    key = (method, route)
+    with _lock:
+        _registry.in_flight -= 1
+        _registry.requests[(method, route, str(status))] += 1
+        h = _registry.latency.get(key)
+        if h is None:
+            h = _registry.latency[key] = Histogram(LATENCY_BUCKETS)
+            _registry.db_queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+        h.observe(elapsed)
+        _registry.db_queries[key].observe(req.queries)
+        _registry.db_seconds[key] += req.db_seconds
+
+
+# ── Exposition (texte Prometheus 0.0.4) ──────────────────────────────────────
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(**labels: str) -> str:
+    def esc(v: str) -> str:
+        return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram(out: List[str], name: str, h: Histogram, **labels: str) -> None:
+    cumulative = 0
+    for bound, count in zip(h.bounds, h.counts):
+        cumulative += count
+        out.append(f"{name}_bucket{_labels(**labels, le=f'{bound:g}')} {cumulative}")
+    cumulative += h.counts[-1]
+    out.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {cumulative}")
+    out.append(f"{name}_sum{_labels(**labels)} {h.sum:.6f}")
+    out.append(f"{name}_count{_labels(**labels)} {cumulative}")
+
+
+def render_text() -> str:
+    w = WORKER
+    with _lock:
+        r = _registry
+        out = [
+            "# HELP podotest_http_requests_total Requêtes HTTP traitées.",
+            "# TYPE podotest_http_requests_total counter",
+        ]
+        for (method, route, status), n in sorted(r.requests.items()):
+            out.append(f"podotest_http_requests_total"
+                       f"{_labels(worker=w, method=method, route=route, status=status)} {n}")
+
+        out += ["# HELP podotest_http_request_duration_seconds Latence des requêtes HTTP.",
+                "# TYPE podotest_http_request_duration_seconds histogram"]
+        for (method, route), h in sorted(r.latency.items()):
+            _histogram(out, "podotest_http_request_duration_seconds", h,
+                       worker=w, method=method, route=route)
+
+        out += ["# HELP podotest_db_queries_per_request Requêtes SQL par requête HTTP.",
+                "# TYPE podotest_db_queries_per_request histogram"]
+        for (method, route), h in sorted(r.db_queries.items()):
+            _histogram(out, "podotest_db_queries_per_request", h,
+                       worker=w, method=method, route=route)
+
+        out += ["# HELP podotest_db_query_seconds_total Temps passé en SQL par route.",
+                "# TYPE podotest_db_query_seconds_total counter"]
+        for (method, route), s in sorted(r.db_seconds.items()):
+            out.append(f"podotest_db_query_seconds_total"
+                       f"{_labels(worker=w, method=method, route=route)} {s:.6f}")
+
+        out += ["# HELP podotest_db_background_queries_total Requêtes SQL hors requête HTTP.",
+                "# TYPE podotest_db_background_queries_total counter",
+                f"podotest_db_background_queries_total{_labels(worker=w)} {r.background_queries}",
+                "# HELP podotest_db_background_query_seconds_total Temps SQL hors requête HTTP.",
+                "# TYPE podotest_db_background_query_seconds_total counter",
+                f"podotest_db_background_query_seconds_total{_labels(worker=w)} "
+                f"{r.background_seconds:.6f}"]
+
+        out += ["# HELP podotest_template_render_seconds Durée de rendu des templates.",
+                "# TYPE podotest_template_render_seconds histogram"]
+        for name, h in sorted(r.render.items()):
+            _histogram(out, "podotest_template_render_seconds", h, worker=w, template=name)
+
+        out += ["# HELP podotest_http_requests_in_flight Requêtes HTTP en cours.",
+                "# TYPE podotest_http_requests_in_flight gauge",
+                f"podotest_http_requests_in_flight{_labels(worker=w)} {r.in_flight}",
+                "# HELP podotest_process_start_time_seconds Démarrage du worker (epoch).",
+                "# TYPE podotest_process_start_time_seconds gauge",
+                f"podotest_process_start_time_seconds{_labels(worker=w)} {_started:.0f}"]
+    return "\n".join(out) + "\n"
+
+
+def reset() -> None:
+    global _registry
+    with _lock:
+        _registry = _Registry()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+
+
+# ── Migrations légères ────────────────────────────────────────────────────────
+# create_all() crée les tables manquantes mais ne modifie pas les tables
+# existantes : chaque étape ci-dessous est idempotente et rejouée au démarrage.
+
+def _answers_unique_index(conn) -> None:
+    names = {ix["name"] for ix in inspect(conn).get_indexes("answers")}
+    if "uq_answers_session_question" in names:
+        return
+    # Supprimer les doublons créés avant l'index (on garde la réponse la plus récente)
+    conn.execute(text(
+        "DELETE FROM answers WHERE id NOT IN ("
+        " SELECT MAX(id) FROM answers GROUP BY session_id, question_id)"
+    ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX uq_answers_session_question "
+        "ON answers (session_id, question_id)"
+    ))
+
+
+def _sessions_score_columns(conn) -> None:
+    cols = {c["name"] for c in inspect(conn).get_columns("sessions")}
+    for name, ddl in (
+        ("correct_count",   "INTEGER DEFAULT 0 NOT NULL"),
+        ("total_questions", "INTEGER DEFAULT 0 NOT NULL"),
+        ("score_pct",       "INTEGER DEFAULT 0 NOT NULL"),
+        ("submitted_at",    "TIMESTAMP"),
+    ):
+        if name not in cols:
+            conn.execute(text(f"ALTER TABLE sessions ADD COLUMN {name} {ddl}"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_sessions_submitted_at ON sessions (submitted_at)"
+    ))
+
+
+def _sessions_score_history(conn) -> None:
+    # Sessions soumises avant les colonnes de score : total_questions = 0
+    # alors qu'il y a des réponses (submit_quiz ne laisse jamais ce cas)
+    pending = conn.execute(text(
+        "SELECT 1 FROM sessions s WHERE s.total_questions = 0"
+        " AND EXISTS (SELECT 1 FROM answers a WHERE a.session_id = s.id) LIMIT 1"
+    )).first()
+    if pending is not None:
+        from sqlalchemy.orm import Session as OrmSession
+
+        import backfill_scores
+        with OrmSession(bind=conn) as db:
+            backfill_scores.backfill(db)
+
+
+def _topic_stats_history(conn) -> None:
+    # Table créée vide par create_all : on y reporte tout l'historique une fois
+    if conn.execute(text("SELECT 1 FROM topic_stats LIMIT 1")).first() is None:
+        import analytics
+        analytics.rebuild(conn)
+
+
+_JSON_COLUMNS = (("questions", "choices_json"), ("answers", "selected_json"))
+
+
+def _json_columns(conn) -> None:
+    """Texte JSON → JSON natif : JSONB + index GIN sur PostgreSQL."""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import JSONB
+        for table, col in _JSON_COLUMNS:
+            types = {c["name"]: c["type"] for c in inspect(conn).get_columns(table)}
+            if not isinstance(types[col], JSONB):
+                conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {col} TYPE jsonb "
+                    f"USING COALESCE(NULLIF({col}, ''), '[]')::jsonb"
+                ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_{col.split('_')[0]}_gin "
+                f"ON {table} USING gin ({col} jsonb_path_ops)"
+            ))
+    else:
+        # SQLite : le type JSON relit le texte existant tel quel ; seules les
+        # valeurs vides ou illisibles (anciennes écritures) sont normalisées
+        for table, col in _JSON_COLUMNS:
+            conn.execute(text(
+                f"UPDATE {table} SET {col} = '[]' WHERE {col} IS NULL OR json_valid({col}) = 0"
+            ))
+
+
+def _choice_masks(conn) -> None:
+    """Bitmasks (choice_mask) à côté du JSON : clé par question, sélection par réponse."""
+    from sqlalchemy import update
+
+    import analytics
+    import choice_mask
+    from models import Answer, Question
+
+    added = []
+    for table in ("questions", "answers"):
+        col = "correct_mask" if table == "questions" else "selected_mask"
+        if col not in {c["name"] for c in inspect(conn).get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} INTEGER DEFAULT 0 NOT NULL"))
+            added.append(table)
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_answers_question_mask ON answers (question_id, selected_mask)"
+    ))
+    if not added:
+        return
+
+    questions = conn.execute(select(Question.id, Question.choices)).all()
+    for qid, choices in questions:
+        choices = choices or []
+        if "questions" in added:
+            conn.execute(update(Question).where(Question.id == qid)
+                         .values(correct_mask=choice_mask.correct_mask(choices)))
+        if "answers" in added:
+            # Un UPDATE par choix (index GIN sur PostgreSQL) : pas de lecture des réponses
+            for cid, bit in choice_mask.bits([c.get("id") for c in choices]).items():
+                conn.execute(
+                    update(Answer)
+                    .where(Answer.question_id == qid,
+                           analytics.selected_contains(conn.dialect.name, cid))
+                    .values(selected_mask=Answer.selected_mask.op("|")(bit))
+                )
+
+
+def _answers_updated_at(conn) -> None:
+    cols = {c["name"] for c in inspect(conn).get_columns("answers")}
+    if "updated_at" not in cols:
+        conn.execute(text("ALTER TABLE answers ADD COLUMN updated_at TIMESTAMP"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_answers_updated_at ON answers (updated_at)"
+    ))
+
+
+STEPS = [
+    _answers_unique_index,
+    _sessions_score_columns,
+    _sessions_score_history,
+    _topic_stats_history,
+    _json_columns,
+    _choice_masks,
+    _answers_updated_at,
+]
+
+
+def upgrade(engine: Engine) -> None:
+    with engine.begin() as conn:
+        for step in STEPS:
+            step(conn)
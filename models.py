@@ -1,8 +1,14 @@
-from sqlalchemy import String, Integer, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import JSON, String, Integer, Boolean, ForeignKey, DateTime, Text, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
+from typing import Optional
 from db import Base
 
+# JSON natif : JSONB sur PostgreSQL (requêtable, index GIN), texte JSON sur
+# SQLite. L'ORM renvoie directement les listes décodées.
+JsonList = JSON().with_variant(JSONB(), "postgresql")
+
 class Quiz(Base):
     __tablename__ = "quizzes"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -15,11 +21,16 @@ class Quiz(Base):
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_choices_gin", "choices_json", postgresql_using="gin",
+              postgresql_ops={"choices_json": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     quiz_id: Mapped[int] = mapped_column(ForeignKey("quizzes.id"))
     kind: Mapped[str] = mapped_column(String)  # "single" | "multi"
     text: Mapped[str] = mapped_column(Text)
-    choices_json: Mapped[str] = mapped_column(Text)  # JSON string of choices [{id,label,is_correct,feedback?}]
+    choices: Mapped[list] = mapped_column("choices_json", JsonList)  # [{id,label,is_correct,feedback?}]
+    correct_mask: Mapped[int] = mapped_column(Integer, default=0)  # bit k = k-ième choix juste
     topic: Mapped[str] = mapped_column(String, default="general")  # pour stats par thème
 
     quiz: Mapped["Quiz"] = relationship(back_populates="questions")
@@ -41,12 +52,54 @@ class Session(Base):
     # IDs des questions tirées aléatoirement pour cette session (JSON)
     question_ids_json: Mapped[str] = mapped_column(Text, default="[]")
 
-    answers: Mapped[list["Answer"]] = relationship(cascade="all, delete-orphan")
+    # Score matérialisé, écrit par submit_quiz avec les réponses
+    correct_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    total_questions: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    score_pct: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    submitted_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+
+    answers: Mapped[list["Answer"]] = relationship(cascade="all, delete-orphan", order_by="Answer.id")
 
 class Answer(Base):
     __tablename__ = "answers"
+    # Une seule réponse par question et par session (double-clic, resoumission)
+    __table_args__ = (
+        Index("uq_answers_session_question", "session_id", "question_id", unique=True),
+        # Recherche dans le JSON : selected_json @> '["C"]'
+        Index("ix_answers_selected_gin", "selected_json", postgresql_using="gin",
+              postgresql_ops={"selected_json": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+        # « qui a coché B ? » : selected_mask IN (…) par question, sans lire le JSON
+        Index("ix_answers_question_mask", "question_id", "selected_mask"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     session_id: Mapped[int] = mapped_column(ForeignKey("sessions.id"))
     question_id: Mapped[int] = mapped_column(ForeignKey("questions.id"))
-    selected_json: Mapped[str] = mapped_column(Text)  # JSON string: ["A","C"]
+    # Lu seulement à la demande : correction et rapports passent par selected_mask
+    selected: Mapped[list] = mapped_column("selected_json", JsonList, deferred=True)  # ["A","C"]
+    selected_mask: Mapped[int] = mapped_column(Integer, default=0)  # bitmask de selected
     is_correct: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Dernière écriture par submit_quiz (la resoumission garde le même id) :
+    # item_analysis relit les réponses modifiées depuis sa dernière mise à jour
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+
+    question: Mapped["Question"] = relationship()
+
+class TopicStat(Base):
+    """Agrégat incrémental : réponses / bonnes réponses par thème et profil."""
+    __tablename__ = "topic_stats"
+    __table_args__ = (
+        Index("uq_topic_stats_key", "topic", "role", "experience", "shop_type", unique=True),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    topic: Mapped[str] = mapped_column(String)
+    role: Mapped[str] = mapped_column(String, default="")
+    experience: Mapped[str] = mapped_column(String, default="")
+    shop_type: Mapped[str] = mapped_column(String, default="")
+    answered: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    correct: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+class AppMeta(Base):
+    """Clés/valeurs techniques (ex. version du bootstrap schéma + seed)."""
+    __tablename__ = "app_meta"
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[str] = mapped_column(String, default="")
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from fastapi.templating import Jinja2Templates
+from jinja2 import Template
+
+try:  # brotli est optionnel : sans lui on sert gzip
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+# ── Cache des pages purement statiques (landing, fiches, profil) ─────────────
+# Le HTML ne dépend que du template et d'un contexte constant : on le rend
+# une fois, on garde les octets + variantes gzip/brotli et un ETag fort.
+# If-None-Match → 304 sans rendu. Le template est re-rendu dès que son
+# fichier change (Template.is_up_to_date, utile en développement).
+
+MAX_AGE = int(os.environ.get("PAGE_CACHE_MAX_AGE", "60"))
+MIN_COMPRESS = 512
+
+
+@dataclass
+class _Entry:
+    template: Template
+    etag: str
+    variants: Dict[str, bytes] = field(default_factory=dict)   # encoding → octets
+
+
+_cache: Dict[Tuple[str, Tuple], _Entry] = {}
+_lock = threading.Lock()
+
+
+def _build(templates: Jinja2Templates, name: str, context: Dict[str, Any]) -> _Entry:
+    tpl = templates.get_template(name)
+    body = tpl.render(context).encode("utf-8")
+    entry = _Entry(template=tpl, etag=hashlib.sha256(body).hexdigest()[:32])
+    entry.variants["identity"] = body
+    if len(body) >= MIN_COMPRESS:
+        entry.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            entry.variants["br"] = brotli.compress(body, quality=11)
+    return entry
+
+
+def _negotiate(request: Request, entry: _Entry) -> str:
+    accepted = request.headers.get("accept-encoding", "")
+    accepted = {part.split(";")[0].strip() for part in accepted.split(",")}
+    for enc in ("br", "gzip"):
+        if enc in accepted and enc in entry.variants:
+            return enc
+    return "identity"
+
+
+def _etag(entry: _Entry, encoding: str) -> str:
+    # ETag fort distinct par représentation (RFC 9110 §8.8.3)
+    return f'"{entry.etag}"' if encoding == "identity" else f'"{entry.etag}-{encoding}"'
+
+
+def _not_modified(request: Request, entry: _Entry) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    if inm.strip() == "*":
+        return True
+    tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+    return any(_etag(entry, enc) in tags for enc in entry.variants)
+
+
+def render(
+    request: Request,
+    templates: Jinja2Templates,
+    name: str,
+    context: Optional[Dict[str, Any]] = None,
+) -> Response:
+    context = context or {}
+    key = (name, tuple(sorted(context.items())))
+    entry = _cache.get(key)
+    if entry is None or not entry.template.is_up_to_date:
+        with _lock:
+            entry = _cache.get(key)
+            if entry is None or not entry.template.is_up_to_date:
+                entry = _build(templates, name, {"request": request, **context})
+                _cache[key] = entry
+
+    encoding = _negotiate(request, entry)
+    headers = {
+        "ETag":          _etag(entry, encoding),
+        "Cache-Control": f"public, max-age={MAX_AGE}, must-revalidate",
+        "Vary":          "Accept-Encoding",
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(entry.variants[encoding], media_type="text/html; charset=utf-8",
+                    headers=headers)
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
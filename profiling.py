@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import json
+import linecache
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs
+
+
+# ── Profilage à la demande (admins) ──────────────────────────────────────────
+# Une requête admin avec ?profile=1 (ou l'en-tête X-Profile: 1) s'exécute
+# sous un profileur CPU par échantillonnage et tracemalloc. Le profil est
+# enregistré dans PROFILE_DIR :
+#   <id>.folded  piles repliées « a;b;c N » (flamegraph.pl, speedscope…)
+#   <id>.json    route, durée, pic mémoire, principaux sites d'allocation
+# L'id est renvoyé dans l'en-tête X-Profile-Id ; /admin/profiles les liste.
+# Un seul profil à la fois par worker ; les autres requêtes ne sont pas
+# touchées. Les piles de tous les threads actifs sont échantillonnées
+# (boucle asyncio + threadpool) : une requête concurrente peut y apparaître.
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(".", "cache", "profiles"))
+INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000
+MAX_PROFILES = 50
+TOP_ALLOCATIONS = 25
+# Intervalle minimal entre deux instantanés mémoire (take_snapshot est coûteux)
+SNAPSHOT_EVERY = 0.25
+
+_busy = threading.Lock()
+# Feuilles de pile d'un thread inactif (attente de socket, de verrou, de file)
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py")
+# … ou bloqué dans un appel C d'une bibliothèque (ex. SimpleQueue.get d'aiosqlite)
+_IDLE_CALL = re.compile(r"\.(get|wait|select|poll|acquire|recv|accept)\(")
+_HERE = os.path.abspath(__file__)
+_ROOT = os.path.dirname(_HERE)
+_idle_lines: Dict[Any, bool] = {}
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    if os.path.basename(code.co_filename) in _IDLE_FILES:
+        return True
+    key = (code, frame.f_lineno)
+    idle = _idle_lines.get(key)
+    if idle is None:
+        line = linecache.getline(code.co_filename, frame.f_lineno)
+        idle = _idle_lines[key] = (os.path.dirname(os.path.abspath(code.co_filename)) != _ROOT
+                                   and bool(_IDLE_CALL.search(line)))
+    return idle
+
+
+def _label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval: float = INTERVAL):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_size = 0
+        self._snapshot_at = 0.0
+        self._halt = threading.Event()
+        self._labels: Dict[Any, str] = {}
+
+    def stop(self) -> None:
+        self._halt.set()
+        self.join()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._halt.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = self._labels.get(code)
+                    if label is None:
+                        label = self._labels[code] = _label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self._watch_memory()
+
+    def _watch_memory(self) -> None:
+        """Garde un instantané proche du pic : c'est là que la mémoire part."""
+        if not tracemalloc.is_tracing():
+            return
+        current, _ = tracemalloc.get_traced_memory()
+        now = time.monotonic()
+        if current > self._snapshot_size * 1.1 and now - self._snapshot_at >= SNAPSHOT_EVERY:
+            self.snapshot = tracemalloc.take_snapshot()
+            self._snapshot_size, self._snapshot_at = current, now
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int = TOP_ALLOCATIONS) -> List[Dict[str, Any]]:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, _HERE),
+    ))
+    out = []
+    for stat in snapshot.statistics("lineno")[:limit]:
+        frame = stat.traceback[0]
+        out.append({
+            "site":  f"{frame.filename}:{frame.lineno}",
+            "kb":    round(stat.size / 1024, 1),
+            "count": stat.count,
+        })
+    return out
+
+
+def _top_functions(stacks: Counter, limit: int = 15) -> List[Dict[str, Any]]:
+    """Temps propre (feuille de pile) par fonction, en % des échantillons."""
+    own: Counter = Counter()
+    for stack, n in stacks.items():
+        own[stack.rsplit(";", 1)[-1]] += n
+    total = sum(own.values()) or 1
+    return [{"function": f, "pct": round(n / total * 100, 1)} for f, n in own.most_common(limit)]
+
+
+# ── Stockage ──────────────────────────────────────────────────────────────────
+
+def _path(profile_id: str, ext: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{ext}")
+
+
+def _save(profile_id: str, meta: Dict[str, Any], stacks: Counter) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(_path(profile_id, "folded"), "w", encoding="utf-8") as fh:
+        for stack, n in stacks.most_common():
+            fh.write(f"{stack} {n}\n")
+    tmp = _path(profile_id, "json.tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, ensure_ascii=False, indent=1)
+    os.replace(tmp, _path(profile_id, "json"))
+    _prune()
+
+
+def _prune(keep: int = MAX_PROFILES) -> None:
+    ids = sorted(list_ids(), reverse=True)
+    for old in ids[keep:]:
+        for ext in ("json", "folded"):
+            try:
+                os.remove(_path(old, ext))
+            except OSError:
+                pass
+
+
+def list_ids() -> List[str]:
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except OSError:
+        return []
+    return [n[:-5] for n in names if n.endswith(".json")]
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Profils enregistrés, du plus récent au plus ancien."""
+    out = []
+    for profile_id in sorted(list_ids(), reverse=True):
+        meta = load(profile_id)
+        if meta is not None:
+            out.append(meta)
+    return out
+
+
+def load(profile_id: str) -> Optional[Dict[str, Any]]:
+    if not _valid_id(profile_id):
+        return None
+    try:
+        with open(_path(profile_id, "json"), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def folded_path(profile_id: str) -> Optional[str]:
+    path = _path(profile_id, "folded")
+    return path if _valid_id(profile_id) and os.path.exists(path) else None
+
+
+def _valid_id(profile_id: str) -> bool:
+    return profile_id.replace("-", "").isalnum()
+
+
+# ── Middleware ────────────────────────────────────────────────────────────────
+
+def _requested(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == b"x-profile" and value.strip() not in (b"", b"0"):
+            return True
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", ["0"])[-1] not in ("", "0")
+
+
+class ProfilingMiddleware:
+    """Profile les requêtes marquées, si authorize(scope) l'autorise (admin)."""
+
+    def __init__(self, app, authorize: Callable[[dict], bool]):
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not _requested(scope)
+                or not self.authorize(scope) or not _busy.acquire(blocking=False)):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode()),
+                ]
+            await send(message)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        sampler = _Sampler()
+        t0 = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            elapsed = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = sampler.snapshot or tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                route = scope.get("route")
+                _save(profile_id, {
+                    "id":          profile_id,
+                    "date":        time.strftime("%d/%m/%Y %H:%M:%S"),
+                    "method":      scope["method"],
+                    "path":        scope["path"],
+                    "route":       route.path if route is not None else scope["path"],
+                    "status":      status,
+                    "seconds":     round(elapsed, 3),
+                    "samples":     sampler.samples,
+                    "interval_ms": round(sampler.interval * 1000, 1),
+                    "peak_kb":     round(peak / 1024, 1),
+                    "functions":   _top_functions(sampler.stacks),
+                    "allocations": _top_allocations(snapshot),
+                }, sampler.stacks)
+            finally:
+                _busy.release()
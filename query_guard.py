@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# ── Détection N+1 et requêtes lentes (développement, CI) ────────────────────
+# Par requête HTTP, chaque instruction SQL est réduite à une empreinte
+# (littéraux et listes IN remplacés). Si une même empreinte revient plus de
+# QUERY_GUARD_REPEAT fois, c'est un N+1 probable : avertissement, ou
+# exception si QUERY_GUARD=raise (tests). Toute instruction plus lente que
+# QUERY_GUARD_SLOW_MS est journalisée avec sa route et ses paramètres.
+# Désactivé par défaut : rien n'est installé en production.
+
+MODE = os.environ.get("QUERY_GUARD", "").strip().lower()          # "", "warn", "raise"
+MAX_REPEAT = int(os.environ.get("QUERY_GUARD_REPEAT", "5"))
+SLOW_MS = float(os.environ.get("QUERY_GUARD_SLOW_MS", "100"))
+
+log = logging.getLogger("podotest.sql")
+
+
+class RepeatedQueryError(RuntimeError):
+    """Même requête SQL exécutée trop de fois pendant une requête HTTP."""
+
+
+@dataclass
+class _Check:
+    route: str
+    counts: Counter = field(default_factory=Counter)
+    samples: Dict[str, str] = field(default_factory=dict)
+    batched: int = 0
+
+
+_current: contextvars.ContextVar[Optional[_Check]] = contextvars.ContextVar("query_guard", default=None)
+
+
+# ── Empreintes ────────────────────────────────────────────────────────────────
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)")
+_IN_LIST = re.compile(r"\bin\s*\((?:\s*\?\s*,?)+\)")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """« SELECT … WHERE id = 3 » et « … WHERE id = ? » → même empreinte."""
+    s = _SPACES.sub(" ", statement.strip().lower())
+    s = _STRING.sub("?", s)
+    s = _PARAM.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    return _IN_LIST.sub("in (…)", s)
+
+
+@contextmanager
+def batched() -> Iterator[None]:
+    """Marque une boucle voulue (pagination par lots) : pas comptée comme N+1."""
+    check = _current.get()
+    if check is not None:
+        check.batched += 1
+    try:
+        yield
+    finally:
+        if check is not None:
+            check.batched -= 1
+
+
+# ── Événements du moteur ─────────────────────────────────────────────────────
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_guard_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("query_guard_t0")
+    if not stack:
+        return
+    elapsed_ms = (time.perf_counter() - stack.pop()) * 1000
+    check = _current.get()
+    route = check.route if check is not None else "<hors requête>"
+    if elapsed_ms >= SLOW_MS:
+        log.warning("Requête lente (%.0f ms) sur %s : %s | paramètres %s",
+                    elapsed_ms, route, _SPACES.sub(" ", statement)[:500], _short(parameters))
+    if check is None or check.batched or executemany:
+        return
+    fp = fingerprint(statement)
+    check.counts[fp] += 1
+    check.samples.setdefault(fp, _short(parameters))
+
+
+def _short(parameters: Any, limit: int = 200) -> str:
+    text = repr(parameters)
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def instrument_engine(engine: Engine) -> None:
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ── Middleware ────────────────────────────────────────────────────────────────
+
+def repeated(check: _Check, max_repeat: int = MAX_REPEAT) -> List[str]:
+    return [
+        f"{n}× {fp[:300]} (ex. paramètres {check.samples.get(fp)})"
+        for fp, n in check.counts.most_common()
+        if n > max_repeat
+    ]
+
+
+class QueryGuardMiddleware:
+    def __init__(self, app, mode: str = MODE, max_repeat: int = MAX_REPEAT):
+        self.app = app
+        self.mode = mode
+        self.max_repeat = max_repeat
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        check = _Check(route=f"{scope['method']} {scope['path']}")
+        token = _current.set(check)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+        route = scope.get("route")
+        if route is not None:
+            check.route = f"{scope['method']} {route.path}"
+        problems = repeated(check, self.max_repeat)
+        if not problems:
+            return
+        message = f"N+1 probable sur {check.route} :\n  " + "\n  ".join(problems)
+        if self.mode == "raise":
+            raise RepeatedQueryError(message)
+        log.warning(message)
+
+
+def install(app, *engines: Engine) -> bool:
+    """Active le détecteur si QUERY_GUARD est défini ; sinon ne fait rien."""
+    if MODE not in ("warn", "raise"):
+        return False
+    for engine in engines:
+        instrument_engine(engine)
+    app.add_middleware(QueryGuardMiddleware)
+    return True
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Session as OrmSession
+
+import choice_mask
+from models import Question
+
+
+# ── Banque de questions en mémoire ────────────────────────────────────────────
+# Les questions changent presque jamais (seed) : on les lit et on construit
+# les choix une seule fois, puis toutes les routes lisent ce cache.
+# invalidate() doit être appelé dès que la banque est (re)seedée ou modifiée.
+
+@dataclass(frozen=True)
+class Choice:
+    id: str
+    label: str
+    is_correct: bool
+
+
+@dataclass(frozen=True)
+class CachedQuestion:
+    id: int
+    quiz_id: int
+    kind: str
+    topic: str
+    text: str
+    choices: Tuple[Choice, ...]
+    labels: Mapping[str, str]          # id → label
+    correct_ids: Tuple[str, ...]       # triés
+    correct_set: FrozenSet[str]
+    choice_ids: Tuple[str, ...]        # ordre des choix = ordre des bits
+    bits: Mapping[str, int]            # id → bit (choice_mask)
+    correct_mask: int                  # clé de correction compilée
+    # Bitmask → ids / labels cochés, précalculés (2^n entrées)
+    ids_by_mask: Tuple[Tuple[str, ...], ...]
+    labels_by_mask: Tuple[Tuple[str, ...], ...]
+
+    def label(self, choice_id: str) -> str:
+        return self.labels.get(choice_id, choice_id)
+
+    def mask(self, choice_ids: Iterable[str]) -> int:
+        return choice_mask.encode(self.bits, choice_ids)
+
+    def ids(self, mask: int) -> Tuple[str, ...]:
+        """Ids des choix du bitmask, dans l'ordre des choix."""
+        return self.ids_by_mask[mask & (len(self.ids_by_mask) - 1)]
+
+    def labels_of(self, mask: int) -> List[str]:
+        return list(self.labels_by_mask[mask & (len(self.labels_by_mask) - 1)])
+
+
+class QuestionBank:
+    def __init__(self, questions: List[CachedQuestion]) -> None:
+        self.by_id: Mapping[int, CachedQuestion] = MappingProxyType({q.id: q for q in questions})
+        by_quiz: Dict[int, List[CachedQuestion]] = {}
+        for q in sorted(questions, key=lambda q: q.id):
+            by_quiz.setdefault(q.quiz_id, []).append(q)
+        self._by_quiz: Mapping[int, Tuple[CachedQuestion, ...]] = MappingProxyType(
+            {k: tuple(v) for k, v in by_quiz.items()}
+        )
+
+    def get(self, question_id: int) -> Optional[CachedQuestion]:
+        return self.by_id.get(question_id)
+
+    def for_quiz(self, quiz_id: int) -> Tuple[CachedQuestion, ...]:
+        return self._by_quiz.get(quiz_id, ())
+
+    def pick(self, question_ids: List[int]) -> List[CachedQuestion]:
+        """Questions dans l'ordre donné, en ignorant les ids inconnus."""
+        return [self.by_id[qid] for qid in question_ids if qid in self.by_id]
+
+
+def _parse(q: Question) -> CachedQuestion:
+    raw = q.choices or []
+    ids = [c.get("id") for c in raw]
+    bits = choice_mask.bits(ids)
+    # Clé de correction : la colonne correct_mask fait foi (écrite avec
+    # choices_json par le seed et les migrations)
+    key = q.correct_mask or 0
+    choices = tuple(
+        Choice(id=c.get("id"), label=c.get("label", ""), is_correct=bool(key & bits[c.get("id")]))
+        for c in raw
+    )
+    return CachedQuestion(
+        id=q.id,
+        quiz_id=q.quiz_id,
+        kind=q.kind,
+        topic=q.topic,
+        text=q.text,
+        choices=choices,
+        labels=MappingProxyType({c.id: c.label for c in choices}),
+        correct_ids=tuple(sorted(c.id for c in choices if c.is_correct)),
+        correct_set=frozenset(c.id for c in choices if c.is_correct),
+        choice_ids=tuple(ids),
+        bits=MappingProxyType(bits),
+        correct_mask=key,
+        ids_by_mask=choice_mask.table(ids),
+        labels_by_mask=choice_mask.table([c.label for c in choices]),
+    )
+
+
+_bank: Optional[QuestionBank] = None
+_lock = threading.Lock()
+
+
+def load(db: OrmSession) -> QuestionBank:
+    """(Re)charge la banque depuis la base."""
+    global _bank
+    with _lock:
+        _bank = QuestionBank([_parse(q) for q in db.query(Question).all()])
+        return _bank
+
+
+def get_bank(db: OrmSession) -> QuestionBank:
+    """Banque en cache ; rechargée seulement après invalidate()."""
+    bank = _bank
+    if bank is None:
+        bank = load(db)
+    return bank
+
+
+def invalidate() -> None:
+    global _bank
+    with _lock:
+        _bank = None
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session as OrmSession, selectinload
+
+from db import AsyncSessionLocal
+from models import Session, Answer
+import grading
+import query_guard
+import question_bank
+from question_bank import QuestionBank
+
+
+# ── Lecture des résultats pour le tableau de bord admin ──────────────────────
+# La liste est paginée par keyset sur Session.id (pas d'OFFSET) et ne charge
+# aucune réponse : le détail d'une session est demandé à part (session_detail)
+# quand la ligne est dépliée. Les questions viennent de question_bank.
+
+ADMIN_PAGE_SIZE = 50
+STATS_WINDOW = 200
+
+
+def load_page(
+    db: OrmSession,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    limit: int = ADMIN_PAGE_SIZE,
+) -> Dict[str, Any]:
+    """Page de sessions (plus récentes d'abord) + curseurs pour naviguer."""
+    q = db.query(Session)
+    if after is not None:
+        sessions = q.filter(Session.id > after).order_by(Session.id.asc()).limit(limit).all()
+        sessions.reverse()
+    else:
+        if before is not None:
+            q = q.filter(Session.id < before)
+        sessions = q.order_by(Session.id.desc()).limit(limit).all()
+
+    newer = older = None
+    if sessions:
+        first_id, last_id = sessions[0].id, sessions[-1].id
+        if db.query(Session.id).filter(Session.id > first_id).first() is not None:
+            newer = first_id
+        if db.query(Session.id).filter(Session.id < last_id).first() is not None:
+            older = last_id
+
+    return {
+        "rows": [
+            {
+                # Score lu sur les colonnes matérialisées (Session.correct_count, …)
+                "session":   s,
+                "correct":   s.correct_count,
+                "total":     s.total_questions,
+                "score_pct": s.score_pct,
+            }
+            for s in sessions
+        ],
+        "newer": newer,   # → ?after=
+        "older": older,   # → ?before=
+    }
+
+
+def dashboard_stats(db: OrmSession, window: int = STATS_WINDOW) -> Dict[str, int]:
+    """Chiffres clés calculés en SQL sur les `window` dernières sessions."""
+    recent = (
+        select(Session.prenom, Session.score_pct)
+        .order_by(Session.id.desc())
+        .limit(window)
+        .subquery()
+    )
+    nb, filled, avg, high = db.execute(
+        select(
+            func.count(),
+            func.count(case((recent.c.prenom != "", 1))),
+            func.avg(recent.c.score_pct),
+            func.count(case((recent.c.score_pct >= 80, 1))),
+        ).select_from(recent)
+    ).one()
+    return {
+        "nb":     nb,
+        "filled": filled,
+        "avg":    round(avg or 0),
+        "high":   high,
+    }
+
+
+def stored_ids(db: OrmSession, answers: List[Answer], bank: QuestionBank) -> Dict[int, list]:
+    """Answer.selected (différé) des seules réponses que le bitmask ne décrit
+    pas (grading.needs_ids), en une requête ; le plus souvent aucune."""
+    ids = []
+    for a in answers:
+        q = bank.get(a.question_id)
+        if q is not None and grading.needs_ids(q, a.selected_mask, a.is_correct):
+            ids.append(a.id)
+    if not ids:
+        return {}
+    return dict(db.execute(select(Answer.id, Answer.selected).where(Answer.id.in_(ids))).all())
+
+
+def answer_detail(a: Answer, bank: QuestionBank,
+                  selected_ids: Optional[List[str]] = None) -> Dict[str, Any] | None:
+    """Détail lisible d'une réponse (labels, manquants, en trop)."""
+    q = bank.get(a.question_id)
+    if q is None:
+        return None
+    return grading.stored(q, a.selected_mask, a.is_correct, selected_ids).feedback()
+
+
+def session_detail(db: OrmSession, session_id: int) -> List[Dict[str, Any]]:
+    bank = question_bank.get_bank(db)
+    answers = (
+        db.query(Answer)
+        .filter(Answer.session_id == session_id)
+        .order_by(Answer.id.asc())
+        .all()
+    )
+    selected = stored_ids(db, answers, bank)
+    detail = []
+    for a in answers:
+        d = answer_detail(a, bank, selected.get(a.id))
+        if d is not None:
+            detail.append(d)
+    return detail
+
+
+# ── Export CSV en flux ───────────────────────────────────────────────────────
+# Les sessions sont lues par pages (keyset sur Session.id) avec leurs réponses
+# chargées en bloc ; chaque page est écrite puis envoyée aussitôt,
+# la mémoire reste donc constante quel que soit l'historique.
+
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_HEADER = [
+    "date", "prenom", "nom", "role", "experience", "type_magasin",
+    "score_global", "total", "score_pct",
+    "n_question", "theme", "question", "type",
+    "reponse_donnee", "bonne_reponse", "correct",
+    "manquait", "en_trop"
+]
+
+
+def _export_rows(s: Session, bank: QuestionBank,
+                 selected: Dict[int, list]) -> Iterator[List[Any]]:
+    answers = s.answers
+    correct_total, total_q, pct = s.correct_count, s.total_questions, s.score_pct
+
+    profile = [
+        s.created_at.strftime('%d/%m/%Y %H:%M') if s.created_at else '',
+        s.prenom, s.nom,
+        s.role.replace('_', ' ') if s.role else '',
+        s.experience.replace('_', ' ') if s.experience else '',
+        s.shop_type.replace('_', ' ') if s.shop_type else '',
+    ]
+
+    if not answers:
+        # Candidat sans réponses — une ligne quand même
+        yield profile + [0, total_q, 0, '', '', '', '', '', '', '', '', '']
+        return
+
+    for i, a in enumerate(answers, 1):
+        q = bank.get(a.question_id)
+        if q is None:
+            continue
+        fb = grading.stored(q, a.selected_mask, a.is_correct, selected.get(a.id)).feedback()
+
+        yield profile + [
+            correct_total, total_q, pct,
+            i,
+            q.topic,
+            q.text,
+            "Choix multiple" if q.kind == "multi" else "Choix unique",
+            " | ".join(fb["selected_labels"]),
+            " | ".join(fb["correct_labels"]),
+            "OUI" if a.is_correct else "NON",
+            " | ".join(fb["missing"]),
+            " | ".join(fb["extra"]),
+        ]
+
+
+async def iter_export_csv(batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    """Génère le CSV (BOM UTF-8, séparateur ';') morceau par morceau.
+
+    Ouvre sa propre session : la dépendance get_async_db est déjà fermée quand
+    StreamingResponse consomme le générateur.
+    """
+    buf = io.StringIO()
+    w = csv.writer(buf, delimiter=';')
+
+    def flush() -> str:
+        chunk = buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+        return chunk
+
+    # BOM UTF-8 pour que Excel l'ouvre correctement avec les accents
+    buf.write('\ufeff')
+    w.writerow(EXPORT_HEADER)
+    yield flush()
+
+    async with AsyncSessionLocal() as db:
+        bank = await db.run_sync(question_bank.get_bank)
+        # Pagination par lots voulue : pas un N+1 pour query_guard
+        with query_guard.batched():
+            last_id = None
+            while True:
+                stmt = (
+                    select(Session)
+                    .options(selectinload(Session.answers))
+                    .order_by(Session.id.desc())
+                    .limit(batch_size)
+                )
+                if last_id is not None:
+                    stmt = stmt.where(Session.id < last_id)
+                page = (await db.scalars(stmt)).all()
+                if not page:
+                    break
+                selected = await db.run_sync(
+                    stored_ids, [a for s in page for a in s.answers], bank)
+                for s in page:
+                    for row in _export_rows(s, bank, selected):
+                        w.writerow(row)
+                last_id = page[-1].id
+                yield flush()
+                # Libérer les objets de la page avant de passer à la suivante
+                db.expunge_all()
@@ -0,0 +1,288 @@
+"""Recherche plein texte dans les fiches et la banque de questions.
+
+Index inversé construit au démarrage à partir du texte extrait des fiches
+(build/fiches/<slug>/texte.txt, produit par fiches.py) et des questions en
+mémoire, puis enregistré sur disque : les redémarrages suivants le relisent
+tel quel tant que les sources n'ont pas changé. Les requêtes ne touchent
+jamais la base.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import fiches
+from question_bank import QuestionBank
+
+CACHE_DIR = os.environ.get("SEARCH_CACHE_DIR", os.path.join(".", "cache", "search"))
+INDEX_FILE = os.path.join(CACHE_DIR, "index.json")
+# À incrémenter quand la normalisation ou le format de l'index change
+INDEX_VERSION = 2
+
+TITLE_WEIGHT = 3      # un mot du titre / thème compte triple
+PREFIX_WEIGHT = 0.7   # « incarn » → incarné, incarnation… un peu moins bien classés
+MAX_EXPANSIONS = 20
+BM25_K1, BM25_B = 1.2, 0.75
+
+
+# ── Normalisation (français, sans accents) ───────────────────────────────────
+
+STOPWORDS = frozenset("""
+a au aux avec ce ces cette dans de des du elle en et est il ils je la le les
+leur lui ma mais me meme mes moi mon ne nos notre nous on ou par pas pour qu
+que qui sa se ses son sont sur ta te tes toi ton tu un une vos votre vous
+y ete etre avoir fait faire plus tres bien tout tous toute toutes peut doit
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+_ELISION = re.compile(r"\b[cdjlmnst]'|\bqu'")
+
+
+def fold(text: str) -> str:
+    """Minuscules, sans accents ni ligatures (« Œdème » → « oedeme »)."""
+    text = text.lower().replace("œ", "oe").replace("æ", "ae").replace("’", "'")
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+# Féminin → masculin (supinatrice → supinateur, plantaire reste plantaire)
+_FEMININE = (("trice", "teur"), ("euse", "eur"), ("ive", "if"), ("enne", "en"))
+
+
+def stem(word: str) -> str:
+    """Racinisation légère : pluriel, féminin, puis e muet final (incarnées → incarn)."""
+    if len(word) > 3 and word[-1] in "sx":
+        word = word[:-1]
+    for fem, masc in _FEMININE:
+        if len(word) > len(fem) + 2 and word.endswith(fem):
+            word = word[:-len(fem)] + masc
+            break
+    for _ in range(2):
+        if len(word) > 3 and word.endswith("e"):
+            word = word[:-1]
+    return word
+
+
+def tokens(text: str) -> List[str]:
+    text = _ELISION.sub(" ", fold(text))
+    return [stem(w) for w in _WORD.findall(text) if w not in STOPWORDS and len(w) > 1]
+
+
+# ── Documents indexés ─────────────────────────────────────────────────────────
+
+def _read(path: str) -> str:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return fh.read()
+    except OSError:
+        return ""
+
+
+def _fiche_for_topic(topic: str) -> Optional[fiches.Fiche]:
+    """Fiche dont le titre partage le plus de mots avec le thème de la question."""
+    words = set(tokens(topic))
+    best, best_n = None, 0
+    for f in fiches.FICHES:
+        n = len(words & set(tokens(f.title)))
+        if n > best_n:
+            best, best_n = f, n
+    return best
+
+
+def documents(bank: QuestionBank) -> List[Dict[str, Any]]:
+    docs: List[Dict[str, Any]] = []
+    for f in fiches.FICHES:
+        docs.append({
+            "kind":  "fiche",
+            "title": f.title,
+            "body":  _read(f.derived("texte.txt")),
+            "url":   f"/fiches#{f.slug}",
+            "pdf":   f"/fiches/{f.slug}.pdf",
+        })
+    # Questions : texte et fiche liée seulement — la recherche est publique,
+    # elle ne doit jamais révéler la bonne réponse
+    for q in sorted(bank.by_id.values(), key=lambda q: q.id):
+        f = _fiche_for_topic(q.topic)
+        docs.append({
+            "kind":    "question",
+            "id":      q.id,
+            "title":   q.topic,
+            "body":    "\n".join([q.text, *(c.label for c in q.choices)]),
+            "text":    q.text,
+            "url":     f"/fiches#{f.slug}" if f else "/fiches",
+        })
+    return docs
+
+
+def fingerprint(docs: List[Dict[str, Any]]) -> str:
+    # Les règles de normalisation font partie de l'empreinte : les modifier
+    # reconstruit l'index au prochain démarrage
+    h = hashlib.sha256(repr((INDEX_VERSION, sorted(STOPWORDS), _FEMININE)).encode())
+    for d in docs:
+        h.update(json.dumps([d["kind"], d["title"], d["body"]], ensure_ascii=False).encode())
+    return h.hexdigest()[:32]
+
+
+# ── Index ─────────────────────────────────────────────────────────────────────
+
+class Index:
+    def __init__(self, data: Dict[str, Any]):
+        self.fingerprint: str = data["fingerprint"]
+        self.docs: List[Dict[str, Any]] = data["docs"]
+        self.lengths: List[int] = data["lengths"]
+        # terme → [(doc, tf pondéré), …]
+        self.postings: Dict[str, List[Tuple[int, int]]] = {
+            t: [tuple(p) for p in plist] for t, plist in data["postings"].items()
+        }
+        self.vocab: List[str] = sorted(self.postings)
+        n = len(self.docs)
+        self.avg_len = (sum(self.lengths) / n) if n else 1.0
+        self.idf = {
+            t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for t, p in self.postings.items()
+        }
+
+    @classmethod
+    def build(cls, docs: List[Dict[str, Any]]) -> "Index":
+        postings: Dict[str, List[List[int]]] = defaultdict(list)
+        lengths = []
+        for i, d in enumerate(docs):
+            tf: Counter = Counter()
+            for t in tokens(d["title"]):
+                tf[t] += TITLE_WEIGHT
+            tf.update(tokens(d["body"]))
+            lengths.append(sum(tf.values()))
+            for t, n in tf.items():
+                postings[t].append([i, n])
+        return cls({
+            "fingerprint": fingerprint(docs),
+            "docs":        docs,
+            "lengths":     lengths,
+            "postings":    postings,
+        })
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version":     INDEX_VERSION,
+            "fingerprint": self.fingerprint,
+            "docs":        self.docs,
+            "lengths":     self.lengths,
+            "postings":    {t: [list(p) for p in plist] for t, plist in self.postings.items()},
+        }
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """Le terme exact, plus les mots de l'index qui le prolongent."""
+        out = [(term, 1.0)] if term in self.postings else []
+        i = bisect_left(self.vocab, term)
+        while i < len(self.vocab) and len(out) < MAX_EXPANSIONS:
+            v = self.vocab[i]
+            if not v.startswith(term):
+                break
+            if v != term:
+                out.append((v, PREFIX_WEIGHT))
+            i += 1
+        return out
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        terms = list(dict.fromkeys(tokens(query)))
+        if not terms:
+            return []
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, set] = defaultdict(set)
+        for qi, term in enumerate(terms):
+            for t, weight in self._expand(term):
+                idf = self.idf[t]
+                for doc, tf in self.postings[t]:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc] / self.avg_len)
+                    scores[doc] += weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    matched[doc].add(qi)
+        # Les documents qui contiennent tous les mots de la requête passent devant
+        ranked = sorted(
+            scores,
+            key=lambda d: scores[d] * (len(matched[d]) / len(terms)) ** 2,
+            reverse=True,
+        )[:limit]
+        return [self._result(d, terms, scores[d]) for d in ranked]
+
+    def _result(self, doc: int, terms: List[str], score: float) -> Dict[str, Any]:
+        d = self.docs[doc]
+        out = {k: v for k, v in d.items() if k != "body"}
+        out["score"] = round(score, 3)
+        out["snippet"] = snippet(d["body"], terms)
+        return out
+
+
+def snippet(body: str, terms: Iterable[str], width: int = 180) -> str:
+    """Extrait autour de la première ligne contenant un des mots cherchés."""
+    lines = [l.strip() for l in body.splitlines() if l.strip()]
+    if not lines:
+        return ""
+    terms = list(terms)
+    best = 0
+    for i, line in enumerate(lines):
+        words = tokens(line)
+        if any(w.startswith(t) for t in terms for w in words):
+            best = i
+            break
+    text = " ".join(lines[best:best + 3])
+    return text if len(text) <= width else text[:width].rsplit(" ", 1)[0] + "…"
+
+
+# ── Cache processus + disque ─────────────────────────────────────────────────
+
+_index: Optional[Index] = None
+_lock = threading.Lock()
+
+
+def _load_file(path: str = INDEX_FILE) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return data if data.get("version") == INDEX_VERSION else None
+
+
+def _write_file(index: Index, path: str = INDEX_FILE) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(index.to_json(), fh, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load(bank: QuestionBank) -> Tuple[Index, bool]:
+    """Relit l'index sur disque s'il est à jour, sinon le reconstruit.
+
+    Renvoie (index, True si reconstruit).
+    """
+    global _index
+    docs = documents(bank)
+    fp = fingerprint(docs)
+    with _lock:
+        data = _load_file()
+        if data is not None and data["fingerprint"] == fp:
+            _index = Index(data)
+            return _index, False
+        _index = Index.build(docs)
+        _write_file(_index)
+        return _index, True
+
+
+def get_index() -> Optional[Index]:
+    return _index
+
+
+def search(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    index = _index
+    if index is None:
+        return []
+    return index.search(query, limit=limit)
@@ -1,33 +1,34 @@
 from __future__ import annotations
 
 import json
+import random
 import secrets
+from datetime import datetime
+from typing import Any, Sequence
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session as OrmSession
-from models import Quiz, Question, Session
+import analytics
+import choice_mask
+from db import upsert
+import grading
+from grading import Graded
+from models import Answer, Quiz, Question, Session
+import question_bank
 
 NB_QUESTIONS = 15
+# À incrémenter quand la banque de questions change : le bootstrap suivant
+# reporte les modifications en base (sync_questions)
+SEED_VERSION = 1
 
 
-def ensure_questions(db: OrmSession) -> None:
-    quiz = db.query(Quiz).filter(Quiz.slug == "demo").first()
-    if quiz is None:
-        quiz = Quiz(
-            title="PodoTest • Formation vendeurs",
-            slug="demo",
-            author="Clara Vialle",
-            is_active=True,
-        )
-        db.add(quiz)
-        db.commit()
-        db.refresh(quiz)
-    existing = db.query(Question).filter(Question.quiz_id == quiz.id).count()
-    if existing == 0:
-        _insert_questions(db, quiz.id)
+# Id du quiz actif, mémorisé par ensure_questions() au démarrage
+_quiz_id: int | None = None
 
 
-def upsert_seed(db: OrmSession) -> str:
-    import random
+def ensure_questions(db: OrmSession, sync: bool = False) -> int:
+    """Quiz actif et ses questions ; sync=True aligne la base sur le seed (bootstrap)."""
+    global _quiz_id
     quiz = db.query(Quiz).filter(Quiz.slug == "demo").first()
     if quiz is None:
         quiz = Quiz(
@@ -39,26 +40,95 @@ def upsert_seed(db: OrmSession) -> str:
         db.add(quiz)
         db.commit()
         db.refresh(quiz)
-    else:
+    elif not quiz.is_active:
         quiz.is_active = True
         db.commit()
+    if sync or db.query(Question).filter(Question.quiz_id == quiz.id).count() == 0:
+        sync_questions(db, quiz.id)
+    _quiz_id = quiz.id
+    return quiz.id
+
 
-    existing = db.query(Question).filter(Question.quiz_id == quiz.id).count()
-    if existing == 0:
-        _insert_questions(db, quiz.id)
+def active_quiz_id(db: OrmSession) -> int:
+    if _quiz_id is None:
+        return ensure_questions(db)
+    return _quiz_id
 
-    all_ids = [row[0] for row in db.query(Question.id).filter(Question.quiz_id == quiz.id).all()]
-    chosen_ids = random.sample(all_ids, min(NB_QUESTIONS, len(all_ids)))
+
+def new_session(db: OrmSession, **profile: Any) -> str:
+    """Crée la session candidat (profil + tirage des questions) : un INSERT, un commit."""
+    quiz_id = active_quiz_id(db)
+    pool = [q.id for q in question_bank.get_bank(db).for_quiz(quiz_id)]
+    chosen_ids = random.sample(pool, min(NB_QUESTIONS, len(pool)))
 
     token = secrets.token_urlsafe(10)
-    s = Session(token=token, quiz_id=quiz.id, question_ids_json=json.dumps(chosen_ids))
-    db.add(s)
+    db.add(Session(token=token, quiz_id=quiz_id,
+                   question_ids_json=json.dumps(chosen_ids),
+                   total_questions=len(chosen_ids), **profile))
     db.commit()
     return token
 
 
+def submit_answers(db: OrmSession, sess: Session, graded: Sequence[Graded]) -> int:
+    """Enregistre une soumission : réponses, agrégat par thème, score matérialisé.
+
+    Sans commit (transaction de l'appelant) ; renvoie le nombre de bonnes
+    réponses. Utilisé par submit_quiz et par les benchmarks.
+    """
+    # Soumission précédente lue avant toute écriture (le verrou d'écriture
+    # SQLite n'est pris qu'au premier UPDATE) ; submitted_at sert de version :
+    # si une soumission concurrente (double-clic) a été validée entre-temps,
+    # l'UPDATE ne touche aucune ligne et on relit, verrou tenu cette fois.
+    seen = sess.submitted_at
+    previous = analytics.stored_results(db, sess.id)
+
+    # Score matérialisé, dans la même transaction que les réponses
+    now = datetime.utcnow()
+    correct = sum(1 for g in graded if g.is_correct)
+    score = {
+        "correct_count":   correct,
+        "total_questions": len(graded),
+        "score_pct":       grading.score_pct(correct, len(graded)),
+        "submitted_at":    now,
+    }
+    version = Session.submitted_at.is_(None) if seen is None else Session.submitted_at == seen
+    taken = db.execute(
+        update(Session).where(Session.id == sess.id, version).values(**score)
+    ).rowcount
+    if not taken:
+        db.execute(update(Session).where(Session.id == sess.id).values(**score))
+        previous = analytics.stored_results(db, sess.id)
+
+    # Toutes les réponses en une requête ; l'index unique (session, question)
+    # rend la resoumission (double-clic) idempotente.
+    upsert(
+        db, Answer.__table__,
+        [
+            {
+                "session_id":    sess.id,
+                "question_id":   g.question.id,
+                "selected_json": list(g.selected_ids),
+                "selected_mask": g.selected_mask,
+                "is_correct":    g.is_correct,
+                "updated_at":    now,
+            }
+            for g in graded
+        ],
+        index_elements=["session_id", "question_id"],
+        update_columns=["selected_json", "selected_mask", "is_correct", "updated_at"],
+    )
+    # Agrégat par thème : la soumission remplace la précédente (écart seulement)
+    analytics.record_submission(db, sess, graded, previous)
+    return correct
+
+
+def sync_questions(db: OrmSession, quiz_id: int) -> None:
+    """Insère ou met à jour les questions du quiz d'après la liste ci-dessous.
 
-def _insert_questions(db: OrmSession, quiz_id: int) -> None:
+    Une question est identifiée par sa position (ordre des ids) : modifier une
+    entrée la met à jour, en ajouter une à la fin l'insère. Une question
+    retirée de la liste reste en base (réponses historiques) : signalée.
+    """
     questions_data = [
 
         # ── FICHE 1 · Hallux Valgus ───────────────────────────────────
@@ -250,12 +320,26 @@ def _insert_questions(db: OrmSession, quiz_id: int) -> None:
 
     ]
 
-    for qd in questions_data:
-        db.add(Question(
-            quiz_id=quiz_id,
-            kind=qd["kind"],
-            topic=qd["topic"],
-            text=qd["text"],
-            choices_json=json.dumps(qd["choices"], ensure_ascii=False),
-        ))
+    existing = (
+        db.query(Question).filter(Question.quiz_id == quiz_id).order_by(Question.id.asc()).all()
+    )
+    for i, qd in enumerate(questions_data):
+        values = {
+            "kind":         qd["kind"],
+            "topic":        qd["topic"],
+            "text":         qd["text"],
+            "choices":      qd["choices"],
+            "correct_mask": choice_mask.correct_mask(qd["choices"]),
+        }
+        if i >= len(existing):
+            db.add(Question(quiz_id=quiz_id, **values))
+            continue
+        q = existing[i]
+        for name, value in values.items():
+            if getattr(q, name) != value:
+                setattr(q, name, value)
+    if len(existing) > len(questions_data):
+        print(f"⚠️  {len(existing) - len(questions_data)} question(s) en base absentes du seed "
+              f"(ids {[q.id for q in existing[len(questions_data):]]}) : conservées")
     db.commit()
+    question_bank.invalidate()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, List
+
+# ── Environnement de test ─────────────────────────────────────────────────────
+# Base SQLite et caches dans un dossier temporaire : fixé avant tout import de
+# l'application (db.py lit DATABASE_URL à l'import). Le détecteur N+1 est
+# actif en mode « raise » : toute route qui répète une requête fait échouer
+# le test qui l'appelle.
+
+_TMP = tempfile.mkdtemp(prefix="podotest-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.sqlite3')}"
+for _name in ("ITEM_CACHE_DIR", "SEARCH_CACHE_DIR", "PROFILE_DIR"):
+    os.environ[_name] = os.path.join(_TMP, _name.lower())
+os.environ.setdefault("QUERY_GUARD", "raise")
+
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(app_module):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_module.app) as c:
+        yield c
+
+
+@pytest.fixture
+def admin(client, app_module):
+    client.post("/admin/login", data={"password": app_module.ADMIN_PASSWORD})
+    yield client
+    client.cookies.clear()
+
+
+@pytest.fixture
+def count_queries():
+    """Compte les requêtes SQL exécutées (moteurs synchrone et asynchrone)."""
+    from db import async_engine, engine
+
+    @contextmanager
+    def counting() -> Iterator[List[str]]:
+        statements: List[str] = []
+
+        def before(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engines = (engine, async_engine.sync_engine)
+        for e in engines:
+            event.listen(e, "before_cursor_execute", before)
+        try:
+            yield statements
+        finally:
+            for e in engines:
+                event.remove(e, "before_cursor_execute", before)
+
+    return counting
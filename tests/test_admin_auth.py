@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+
+def test_valid_token(app_module):
+    now = time.time()
+    assert app_module.check_admin_token(app_module.make_admin_token(now), now=now)
+
+
+def test_tampered_signature(app_module):
+    now = time.time()
+    token = app_module.make_admin_token(now)
+    payload, sig = token.rsplit(".", 1)
+    forged = sig[:-1] + ("A" if sig[-1] != "A" else "B")
+    assert not app_module.check_admin_token(f"{payload}.{forged}", now=now)
+
+
+def test_expired_token(app_module):
+    now = time.time()
+    token = app_module.make_admin_token(now - app_module.ADMIN_TOKEN_TTL - 1)
+    assert not app_module.check_admin_token(token, now=now)
+
+
+def test_token_issued_in_the_future(app_module):
+    now = time.time()
+    assert not app_module.check_admin_token(app_module.make_admin_token(now + 60), now=now)
+
+
+@pytest.mark.parametrize("token", ["", "abc", "1.2", "x.y.z", "1.2.3.4", f"{int(time.time())}.abc.\xe9"])
+def test_malformed_token(app_module, token):
+    assert not app_module.check_admin_token(token)
+
+
+def test_forged_cookie_redirects_to_login(client):
+    cookie = f"admin_token={int(time.time())}.abc.\xe9".encode("latin-1")
+    r = client.get("/admin", headers={"cookie": cookie}, follow_redirects=False)
+    assert r.status_code == 302
+    assert r.headers["location"] == "/admin/login"
+
+    r = client.get("/metrics", headers={"cookie": cookie})
+    assert r.status_code == 401
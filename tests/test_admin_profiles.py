@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import os
+
+import profiling
+
+
+def test_folded_profile_is_not_cached(admin):
+    os.makedirs(profiling.PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(profiling.PROFILE_DIR, "test-1.folded"), "w", encoding="utf-8") as fh:
+        fh.write("app.py:submit_quiz 1\n")
+
+    r = admin.get("/admin/profiles/test-1.folded")
+    assert r.status_code == 200
+    assert r.headers["cache-control"] == "private, no-store"
+
+
+def test_folded_profile_requires_admin(client):
+    r = client.get("/admin/profiles/test-1.folded")
+    assert r.status_code == 401
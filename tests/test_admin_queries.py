@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import gen_history
+import reporting
+
+# Plus d'une page de tableau de bord, puis dix fois plus
+N = reporting.ADMIN_PAGE_SIZE + 10
+MAX_QUERIES = 6
+
+
+def _admin_queries(client, count_queries) -> int:
+    with count_queries() as statements:
+        r = client.get("/admin")
+    assert r.status_code == 200
+    return len(statements)
+
+
+def test_admin_query_count_is_bounded(admin, count_queries):
+    gen_history.generate(N, verbose=False)
+    small = _admin_queries(admin, count_queries)
+
+    gen_history.generate(9 * N, verbose=False)
+    large = _admin_queries(admin, count_queries)
+
+    assert small == large
+    assert small <= MAX_QUERIES
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import pytest
+
+import assets
+
+
+@pytest.fixture
+def style_url():
+    url = assets.asset("style.css")
+    if not url.startswith(assets.URL_PREFIX):
+        pytest.skip("static/dist non construit (python assets.py)")
+    return url
+
+
+@pytest.mark.parametrize("encoding", ["br", "gzip"])
+def test_precompressed_variant_revalidates(client, style_url, encoding):
+    headers = {"Accept-Encoding": encoding}
+    r = client.get(style_url, headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-encoding"] == encoding
+
+    r = client.get(style_url, headers={**headers, "If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["cache-control"] == assets.IMMUTABLE
+
+
+def test_uncompressed_revalidates(client, style_url):
+    headers = {"Accept-Encoding": "identity"}
+    r = client.get(style_url, headers=headers)
+    assert r.status_code == 200 and "content-encoding" not in r.headers
+
+    r = client.get(style_url, headers={**headers, "If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import pytest
+
+import grading
+import question_bank
+
+
+@pytest.fixture
+def bank(client):
+    from db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        yield question_bank.get_bank(db)
+    finally:
+        db.close()
+
+
+def _first(bank, kind):
+    return next(q for q in bank.by_id.values() if q.kind == kind)
+
+
+def test_multi_choice_exact_key(bank):
+    q = _first(bank, "multi")
+    assert grading.grade(q, q.correct_ids).is_correct
+    assert not grading.grade(q, q.correct_ids[:-1]).is_correct
+
+
+def test_unknown_choice_is_wrong(bank):
+    q = _first(bank, "multi")
+    g = grading.grade(q, [*q.correct_ids, "Z"])
+    assert not g.is_correct
+    # Stocké tel que soumis ; signalé en trop dans le détail
+    assert g.selected_ids == tuple(sorted([*q.correct_ids, "Z"]))
+    assert "Z" in g.feedback()["extra"]
+    assert not grading.grade(_first(bank, "single"), ["Z"]).is_correct
+
+
+def test_key_comes_from_correct_mask_column(bank):
+    for q in bank.by_id.values():
+        assert q.correct_mask == sum(q.bits[i] for i in q.correct_ids)
+        assert q.correct_ids == tuple(c.id for c in q.choices if c.is_correct)
+
+
+def test_unknown_choice_kept_in_admin_detail_and_export(admin, bank):
+    import json
+
+    import models
+    from db import SessionLocal
+
+    q = _first(bank, "multi")
+    r = admin.post("/quiz", data={"consent": "1", "prenom": "Zed", "role": "autre"},
+                   follow_redirects=False)
+    token = r.headers["location"].rsplit("/", 1)[-1]
+    with SessionLocal() as db:
+        sess = db.query(models.Session).filter_by(token=token).one()
+        sess.question_ids_json = json.dumps([q.id])
+        db.commit()
+        session_id = sess.id
+
+    admin.post(f"/t/{token}", data={f"q{q.id}": [*q.correct_ids, "Z"]})
+
+    (d,) = admin.get(f"/admin/sessions/{session_id}/detail").json()["detail"]
+    assert not d["is_correct"]
+    assert "Z" in d["selected_labels"] and d["extra"] == ["Z"]
+
+    rows = [line.split(";") for line in admin.get("/admin/export.csv").text.splitlines()]
+    (row,) = [r for r in rows if r[1] == "Zed"]
+    assert row[15:] == ["NON", "", "Z"]
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import numpy as np
+
+import item_analysis
+
+
+def _matrices(n=400, q=6, seed=0):
+    rng = np.random.default_rng(seed)
+    C = rng.choice([-1, 0, 1], size=(n, q), p=[.2, .4, .4]).astype(np.int8)
+    B = np.where(C >= 0, rng.integers(1, 16, size=(n, q)), 0).astype(np.uint8)
+    return C, B
+
+
+def _rest(C):
+    A = C >= 0
+    X = np.where(A, C, 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rest = (X.sum(axis=1)[:, None] - X) / (A.sum(axis=1)[:, None] - 1)
+    return np.where(np.isfinite(rest), rest, 0)
+
+
+def test_choice_stats_match_direct_computation():
+    C, B = _matrices()
+    stats = item_analysis.compute(C, B, n_choices=4)
+    rest = _rest(C)
+    for j in range(C.shape[1]):
+        asked = C[:, j] >= 0
+        assert stats["n"][j] == asked.sum()
+        assert np.isclose(stats["p_value"][j], C[asked, j].mean())
+        assert np.isclose(stats["discrimination"][j],
+                          np.corrcoef(C[asked, j], rest[asked, j])[0, 1], atol=1e-5)
+        for k in range(4):
+            chosen = (B[asked, j] >> k) & 1
+            assert np.isclose(stats["choice_rate"][j, k], chosen.mean())
+            assert np.isclose(stats["choice_discrimination"][j, k],
+                              np.corrcoef(chosen, rest[asked, j])[0, 1], atol=1e-5)
+
+
+def test_constant_column_has_no_correlation():
+    C, B = _matrices()
+    C[:, 0] = np.where(C[:, 0] >= 0, 1, -1)
+    B[:, 0] = np.where(C[:, 0] >= 0, 1, 0)
+    stats = item_analysis.compute(C, B, n_choices=4)
+    assert np.isnan(stats["discrimination"][0])
+    assert np.isnan(stats["choice_discrimination"][0, 0])
+    assert stats["choice_rate"][0, 1] == 0
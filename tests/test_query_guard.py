@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import gen_history
+import query_guard
+from db import engine
+from models import Session
+
+PAGES = ["/", "/fiches", "/quiz", "/search?q=hallux", "/admin", "/admin/analytics",
+         "/admin/questions", "/admin/sessions/1/detail", "/admin/export.csv"]
+
+
+def test_guard_is_on_in_tests(app_module):
+    assert query_guard.MODE == "raise"
+    assert any(m.cls is query_guard.QueryGuardMiddleware for m in app_module.app.user_middleware)
+
+
+@pytest.mark.parametrize("path", PAGES)
+def test_pages_have_no_repeated_queries(admin, path):
+    gen_history.generate(20, verbose=False)
+    assert admin.get(path).status_code == 200
+
+
+def _loop_app(batched: bool) -> FastAPI:
+    loop_app = FastAPI()
+    loop_app.add_middleware(query_guard.QueryGuardMiddleware, mode="raise")
+
+    @loop_app.get("/loop")
+    def loop():
+        # Une requête par ligne : le N+1 typique
+        with engine.connect() as conn:
+            if batched:
+                with query_guard.batched():
+                    for i in range(query_guard.MAX_REPEAT + 1):
+                        conn.execute(select(Session.id).where(Session.id == i))
+            else:
+                for i in range(query_guard.MAX_REPEAT + 1):
+                    conn.execute(select(Session.id).where(Session.id == i))
+        return {}
+
+    return loop_app
+
+
+def test_per_row_loop_raises(app_module):
+    with pytest.raises(query_guard.RepeatedQueryError):
+        TestClient(_loop_app(batched=False)).get("/loop")
+
+
+def test_batched_loop_is_allowed(app_module):
+    assert TestClient(_loop_app(batched=True)).get("/loop").status_code == 200